@@ -0,0 +1,44 @@
+"""add playback_events
+
+Revision ID: 7b1f3c9a5d20
+Revises: 23e91dd766df
+Create Date: 2026-10-18 10:12:41.306117
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1f3c9a5d20'
+down_revision: Union[str, None] = '23e91dd766df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'playback_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('account_id', sa.Integer(), sa.ForeignKey('accounts.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('track_id', sa.String(), nullable=True),
+        sa.Column('track_name', sa.String(), nullable=True),
+        sa.Column('artist_name', sa.String(), nullable=True),
+        sa.Column('album_name', sa.String(), nullable=True),
+        sa.Column('device_name', sa.String(), nullable=True),
+        sa.Column('progress_ms', sa.Integer(), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_playback_events_account_occurred', 'playback_events', ['account_id', 'occurred_at'])
+    op.create_index(
+        'ix_playback_events_occurred_brin', 'playback_events', ['occurred_at'], postgresql_using='brin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playback_events_occurred_brin', table_name='playback_events')
+    op.drop_index('ix_playback_events_account_occurred', table_name='playback_events')
+    op.drop_table('playback_events')
@@ -1,10 +1,36 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.metrics import instrument_engine
+
+
+def _engine_options(settings: Settings) -> dict:
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if "+asyncpg" in settings.database_url:
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return options
 
-engine = create_async_engine(get_settings().database_url)
+
+engine = create_async_engine(get_settings().database_url, **_engine_options(get_settings()))
+instrument_engine(engine.sync_engine)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Same pool, but autocommit: no BEGIN/COMMIT round trips around single SELECTs
+read_session = async_sessionmaker(
+    engine.execution_options(isolation_level="AUTOCOMMIT"), class_=AsyncSession, expire_on_commit=False
+)
 
 
 class Base(DeclarativeBase):
@@ -14,3 +40,30 @@ class Base(DeclarativeBase):
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         yield session
+
+
+async def get_read_db() -> AsyncSession:
+    """Session for read-only routes; writes through it are committed immediately."""
+    async with read_session() as session:
+        yield session
+
+
+async def prewarm(connections: int) -> None:
+    """Open ``connections`` pooled connections at once, then return them to the pool."""
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+        for conn in conns:
+            await conn.execute(text("SELECT 1"))
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
@@ -1,14 +1,66 @@
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.config import get_settings
+from app.database import engine, pool_stats, prewarm as prewarm_db
+from app.metrics import StartupTimer
 from app.middleware.auth import AuthMiddleware
-from app.routers import auth, google_auth, playback
+from app.middleware.metrics import MetricsMiddleware
+from app.routers import auth, google_auth, history, media, playback
+from app.services import http_client
+from app.services.account_registry import account_registry
+from app.services.circuit_breaker import CircuitOpen, circuit_breakers
+from app.services.coordination import coordinator
+from app.services.history import history_recorder
+from app.services.poller import poller
+from app.services.pubsub import listener
+from app.services.rate_limiter import RateLimited, rate_governor
+from app.services.token_scheduler import token_scheduler
 
-app = FastAPI(title="Spotify Control Panel")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timer = StartupTimer()
+
+    async def warm_db():
+        with timer.phase("db_prewarm"):
+            await prewarm_db(settings.db_prewarm_connections)
+
+    async def warm_http():
+        with timer.phase("http_prewarm"):
+            await http_client.prewarm(settings.spotify_api_base_url, settings.spotify_accounts_base_url)
+
+    # Handshakes for both pools overlap instead of landing on the first requests
+    await asyncio.gather(warm_db(), warm_http())
+    # The registry and coordinator register their LISTEN channels before the listener connects
+    with timer.phase("account_registry"):
+        await account_registry.start()
+    coordinator.start()
+    with timer.phase("listener"):
+        await listener.start()
+    token_scheduler.start()
+    poller.start()
+    history_recorder.start()
+    timer.report()
+    yield
+    await poller.stop()
+    await history_recorder.stop()
+    await token_scheduler.stop()
+    await coordinator.stop()
+    await listener.stop()
+    await http_client.close_client()
+    await engine.dispose()
+
+
+app = FastAPI(title="Spotify Control Panel", lifespan=lifespan)
 
 settings = get_settings()
 
@@ -18,19 +70,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Poll-After-Ms"],
 )
 app.add_middleware(AuthMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
 
 app.include_router(google_auth.router, prefix="/google", tags=["google-auth"])
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(playback.router, prefix="/playback", tags=["playback"])
-
-# Serve frontend static files in production (built React app)
-static_dir = Path(__file__).parent.parent / "static"
-if static_dir.exists():
-    app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="static")
+app.include_router(history.router, prefix="/playback", tags=["history"])
+app.include_router(media.router, prefix="/media", tags=["media"])
 
 
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics")
+async def metrics(request: Request):
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/rate-limit")
+async def rate_limit():
+    return rate_governor.usage()
+
+
+@app.get("/api/circuits")
+async def circuits():
+    return {"open": circuit_breakers.open_endpoints()}
+
+
+@app.get("/api/db-pool")
+async def db_pool():
+    return pool_stats()
+
+
+# Serve frontend static files in production (built React app).
+# Mounted last: a mount at "/" shadows any route registered after it.
+static_dir = Path(__file__).parent.parent / "static"
+if static_dir.exists():
+    app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="static")
@@ -0,0 +1,84 @@
+"""Prometheus metrics, recorded from the shared code paths only.
+
+Labels are limited to low-cardinality values (endpoint paths, statuses, route
+templates); never tokens, emails or account ids.
+"""
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_LATENCY = Histogram(
+    "spotify_upstream_request_seconds",
+    "Latency of outbound Spotify calls",
+    ["endpoint", "status"],
+)
+UPSTREAM_IN_FLIGHT = Gauge("spotify_upstream_requests_in_flight", "Outbound Spotify calls in progress")
+TOKEN_REFRESHES = Counter("spotify_token_refreshes_total", "Access token refreshes", ["outcome"])
+RATE_LIMITED = Counter("spotify_rate_limited_total", "429 responses received from Spotify")
+CIRCUIT_OPEN = Gauge("spotify_circuit_open", "1 while calls to the endpoint are short-circuited", ["endpoint"])
+HEDGED_REQUESTS = Counter("spotify_hedged_requests_total", "Duplicate GETs sent because the first was slow")
+NO_ACTIVE_DEVICE = Counter("spotify_no_active_device_total", "Commands rejected with 403 (no active device)")
+
+DB_QUERY_LATENCY = Histogram("db_query_seconds", "Database statement latency", ["operation"])
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Connections in the engine pool", ["state"])
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_seconds",
+    "Latency of requests served by this app",
+    ["method", "route", "status"],
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+HISTORY_EVENTS = Counter("playback_history_events_total", "Playback history events written or dropped", ["outcome"])
+MEDIA_CACHE_REQUESTS = Counter("media_cover_requests_total", "Album cover lookups in the disk cache", ["result"])
+
+STARTUP_PHASE_SECONDS = Gauge("app_startup_phase_seconds", "Time spent in each lifespan startup phase", ["phase"])
+
+
+class StartupTimer:
+    """Times named startup phases into STARTUP_PHASE_SECONDS and logs a summary."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+            STARTUP_PHASE_SECONDS.labels(name).set(self.phases[name])
+
+    def report(self) -> None:
+        total = time.perf_counter() - self.started
+        STARTUP_PHASE_SECONDS.labels("total").set(total)
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        logger.info("Startup finished in %.0fms (%s)", total * 1000, breakdown)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run through the engine, labelled by SQL verb, and export pool usage."""
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CONNECTIONS.labels("checked_out").set_function(pool.checkedout)
+        DB_POOL_CONNECTIONS.labels("checked_in").set_function(pool.checkedin)
+        DB_POOL_CONNECTIONS.labels("overflow").set_function(pool.overflow)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(operation).observe(elapsed)
@@ -1,41 +1,98 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import time
+from collections import OrderedDict
+
+from starlette.requests import cookie_parser
 from starlette.responses import JSONResponse, RedirectResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.config import get_allowed_emails, get_settings
-from app.session import verify_session_token
+from app.session import decode_session_token
 
-PUBLIC_PATHS = {
+PUBLIC_PATHS = frozenset({
     "/google/login",
     "/google/callback",
     "/auth/login",
     "/auth/callback",
     "/api/health",
-}
+})
+# Guarded by METRICS_TOKEN instead of a session, when one is configured
+METRICS_PATH = "/api/metrics"
+API_PREFIXES = ("/auth/", "/playback/", "/api/", "/media/")
+
+
+class VerifiedSessionCache:
+    """Bounded LRU of session tokens whose signature has already been checked.
+
+    Entries are only served until the token's own ``exp``.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
 
+    def get(self, token: str) -> str | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        email, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return email
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
+    def put(self, token: str, email: str, expires_at: float) -> None:
+        self._entries[token] = (email, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
 
-        if path in PUBLIC_PATHS:
-            return await call_next(request)
 
+class AuthMiddleware:
+    """Pure ASGI session check; streaming responses pass through untouched."""
+
+    def __init__(self, app: ASGIApp):
         settings = get_settings()
-        session_token = request.cookies.get("session")
+        self.app = app
+        self.sessions = VerifiedSessionCache(settings.session_cache_size)
+        self.public_paths = PUBLIC_PATHS | {METRICS_PATH} if settings.metrics_token else PUBLIC_PATHS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.public_paths:
+            await self.app(scope, receive, send)
+            return
 
+        session_token = _session_cookie(scope)
         if session_token:
-            email = verify_session_token(session_token, settings.session_secret)
+            email = self._verify(session_token)
             if email and email.lower() in get_allowed_emails():
-                request.state.user_email = email
-                return await call_next(request)
+                scope.setdefault("state", {})["user_email"] = email
+                await self.app(scope, receive, send)
+                return
 
         # API routes get a 401 JSON response
-        if path.startswith(("/auth/", "/playback/", "/api/")):
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Not authenticated"},
-            )
-
-        # Everything else (static files, pages) redirects to Google login
-        return RedirectResponse("/google/login")
+        if scope["path"].startswith(API_PREFIXES):
+            response = JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+        else:
+            # Everything else (static files, pages) redirects to Google login
+            response = RedirectResponse("/google/login")
+        await response(scope, receive, send)
+
+    def _verify(self, token: str) -> str | None:
+        email = self.sessions.get(token)
+        if email is not None:
+            return email
+        payload = decode_session_token(token, get_settings().session_secret)
+        if not payload or not payload.get("email"):
+            return None
+        if "exp" in payload:
+            self.sessions.put(token, payload["email"], payload["exp"])
+        return payload["email"]
+
+
+def _session_cookie(scope: Scope) -> str | None:
+    # HTTP/2 clients may split cookies across several headers
+    cookies = [value.decode("latin-1") for name, value in scope["headers"] if name == b"cookie"]
+    if not cookies:
+        return None
+    return cookie_parser("; ".join(cookies)).get("session")
@@ -0,0 +1,46 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_LATENCY
+
+
+class MetricsMiddleware:
+    """Per-route latency and in-flight gauge; labels use the route template, not the raw path.
+
+    Server-sent event streams are left out of the latency histogram, since
+    their duration is how long the client stayed connected.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            if not streaming:
+                route = scope.get("route")
+                HTTP_REQUEST_LATENCY.labels(
+                    scope["method"], getattr(route, "path", "unmatched"), str(status)
+                ).observe(time.perf_counter() - start)
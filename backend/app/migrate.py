@@ -0,0 +1,67 @@
+"""Container start step: bring the schema to head, but only when it isn't already.
+
+`alembic upgrade head` loads the whole migration environment on every start
+even when there is nothing to do. This reads the database's current revision
+and compares it to the script heads first, so an up-to-date start costs one
+query. Behaviour is chosen by MIGRATE_ON_START: "upgrade" (default), "check"
+(fail the start if migrations are pending) or "skip".
+
+    python -m app.migrate
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.migrate")
+
+ALEMBIC_INI = Path(__file__).parent.parent / "alembic.ini"
+
+
+async def _current_revisions(database_url: str) -> set[str]:
+    engine = create_async_engine(database_url, poolclass=pool.NullPool)
+    try:
+        async with engine.connect() as conn:
+            return set(await conn.run_sync(lambda sync: MigrationContext.configure(sync).get_current_heads()))
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+    settings = get_settings()
+    if settings.migrate_on_start == "skip":
+        logger.info("Skipping migration check")
+        return 0
+
+    started = time.perf_counter()
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    current = asyncio.run(_current_revisions(settings.database_url))
+    if current == heads:
+        logger.info("Schema at head %s (checked in %.0fms)", ",".join(sorted(heads)), (time.perf_counter() - started) * 1000)
+        return 0
+    if settings.migrate_on_start == "check":
+        logger.error("Schema at %s, expected %s", sorted(current) or "empty", sorted(heads))
+        return 1
+
+    logger.info("Upgrading schema from %s to %s", sorted(current) or "empty", sorted(heads))
+    command.upgrade(config, "head")
+    logger.info("Migrations finished in %.0fms", (time.perf_counter() - started) * 1000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
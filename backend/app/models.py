@@ -1,7 +1,10 @@
+import hashlib
+import time
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel
-from sqlalchemy import DateTime, Integer, String
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -22,6 +25,29 @@ class Account(Base):
     sort_order: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
 
+class PlaybackEvent(Base):
+    """Append-only log of playback transitions (track changes, play/pause, device switches)."""
+
+    __tablename__ = "playback_events"
+    __table_args__ = (
+        Index("ix_playback_events_account_occurred", "account_id", "occurred_at"),
+        # Rows arrive in time order, so a BRIN index covers time ranges at a fraction of a B-tree's size
+        Index("ix_playback_events_occurred_brin", "occurred_at", postgresql_using="brin"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"))
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    kind: Mapped[str] = mapped_column(String(16))
+    track_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    track_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    artist_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    album_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    device_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    progress_ms: Mapped[int] = mapped_column(Integer, default=0)
+    duration_ms: Mapped[int] = mapped_column(Integer, default=0)
+
+
 # ── Pydantic schemas ──
 
 
@@ -34,8 +60,15 @@ class AccountOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+# Left out of compact states; clients look them up once per track via track_id
+TRACK_FIELDS = frozenset({"track_name", "artist_name", "album_name", "album_image_url"})
+# While playing, progress only changes the ETag when it jumps (a seek) by about this much
+ETAG_SEEK_RESOLUTION_MS = 2000
+
+
 class PlaybackState(BaseModel):
     is_playing: bool
+    track_id: str | None = None
     track_name: str | None = None
     artist_name: str | None = None
     album_name: str | None = None
@@ -44,3 +77,81 @@ class PlaybackState(BaseModel):
     duration_ms: int = 0
     volume_percent: int | None = None
     device_name: str | None = None
+    # Server time (epoch ms) at which progress_ms was read, for client-side interpolation
+    timestamp_ms: int = Field(default_factory=lambda: int(time.time() * 1000))
+    # Last known state served while Spotify is unreachable
+    stale: bool = False
+
+    def etag(self, compact: bool = False) -> str:
+        """Weak ETag for the full (or compact) body, ignoring progress that clients extrapolate.
+
+        Paused, the position is part of the tag. Playing, the tag covers when
+        the track would have started at the current position, so it stays put
+        as progress advances but changes after a seek.
+        """
+        body = self.model_dump_json(exclude={"progress_ms", "timestamp_ms"})
+        if self.is_playing:
+            position = (self.timestamp_ms - self.progress_ms) // ETAG_SEEK_RESOLUTION_MS
+        else:
+            position = self.progress_ms
+        tag = f"{body}|{position}|{'compact' if compact else 'full'}"
+        return f'W/"{hashlib.blake2b(tag.encode(), digest_size=8).hexdigest()}"'
+
+
+class AccountStateResult(BaseModel):
+    state: PlaybackState | None = None
+    error: str | None = None
+    # Server hint for when this account's state is next worth fetching
+    next_poll_after_ms: int | None = None
+
+
+class GroupCommand(BaseModel):
+    command: Literal["play", "pause", "volume", "seek", "next", "previous"]
+    # None targets every linked account
+    account_ids: list[int] | None = None
+    # Volume level (0-100) or seek position in ms
+    value: int | None = None
+
+    @model_validator(mode="after")
+    def check_value(self) -> "GroupCommand":
+        if self.command == "volume" and (self.value is None or not 0 <= self.value <= 100):
+            raise ValueError("volume requires a value between 0 and 100")
+        if self.command == "seek" and (self.value is None or self.value < 0):
+            raise ValueError("seek requires a non-negative value")
+        return self
+
+
+class GroupCommandResult(BaseModel):
+    account_id: int
+    ok: bool
+    error: str | None = None
+    coalesced: bool = False
+    latency_ms: float
+
+
+class PlaybackEventOut(BaseModel):
+    occurred_at: datetime
+    kind: str
+    track_id: str | None
+    track_name: str | None
+    artist_name: str | None
+    album_name: str | None
+    device_name: str | None
+    progress_ms: int
+    duration_ms: int
+
+    model_config = {"from_attributes": True}
+
+
+class TrackPlays(BaseModel):
+    track_id: str | None
+    track_name: str | None
+    artist_name: str | None
+    plays: int
+
+
+class AccountHistorySummary(BaseModel):
+    account_id: int
+    events: dict[str, int]
+    distinct_tracks: int
+    top_tracks: list[TrackPlays]
@@ -1,23 +1,20 @@
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import Settings, get_allowed_emails, get_settings
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import AccountOut
 from app.services import account_manager
+from app.services.http_client import get_client
+from app.services.poller import poller
 from app.session import verify_session_token
 
 router = APIRouter()
 
-SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_ME_URL = "https://api.spotify.com/v1/me"
-
 SCOPES = "user-read-playback-state user-modify-playback-state user-read-currently-playing"
 
 
@@ -34,7 +31,7 @@ async def login(request: Request, settings: Settings = Depends(get_settings)):
         "show_dialog": "true",  # Always show login so user can pick a different account
         "state": session_token,
     }
-    return RedirectResponse(f"{SPOTIFY_AUTH_URL}?{urlencode(params)}")
+    return RedirectResponse(f"{settings.spotify_authorize_url}?{urlencode(params)}")
 
 
 @router.get("/callback")
@@ -54,39 +51,39 @@ async def callback(
         raise HTTPException(status_code=403, detail="Forbidden")
 
     # Exchange code for tokens
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post(
-            SPOTIFY_TOKEN_URL,
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": settings.spotify_redirect_uri,
-                "client_id": settings.spotify_client_id,
-                "client_secret": settings.spotify_client_secret,
-            },
-        )
-        if token_resp.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to exchange authorization code")
-        token_data = token_resp.json()
-
-        access_token = token_data["access_token"]
-        refresh_token = token_data["refresh_token"]
-        expires_in = token_data["expires_in"]
-        token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-
-        # Fetch user profile
-        profile_resp = await client.get(
-            SPOTIFY_ME_URL,
-            headers={"Authorization": f"Bearer {access_token}"},
+    client = get_client()
+    token_resp = await client.post(
+        settings.spotify_token_url,
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.spotify_redirect_uri,
+            "client_id": settings.spotify_client_id,
+            "client_secret": settings.spotify_client_secret,
+        },
+    )
+    if token_resp.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to exchange authorization code")
+    token_data = token_resp.json()
+
+    access_token = token_data["access_token"]
+    refresh_token = token_data["refresh_token"]
+    expires_in = token_data["expires_in"]
+    token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+
+    # Fetch user profile
+    profile_resp = await client.get(
+        settings.spotify_me_url,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    if profile_resp.status_code != 200:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to fetch Spotify profile: {profile_resp.status_code} {profile_resp.text}",
         )
-        if profile_resp.status_code != 200:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to fetch Spotify profile: {profile_resp.status_code} {profile_resp.text}",
-            )
-        profile = profile_resp.json()
-
-    await account_manager.upsert_account(
+    profile = profile_resp.json()
+
+    account = await account_manager.upsert_account(
         db,
         spotify_user_id=profile["id"],
         display_name=profile.get("display_name") or profile["id"],
@@ -94,23 +91,26 @@ async def callback(
         refresh_token=refresh_token,
         token_expires_at=token_expires_at,
     )
+    poller.watch(account.id)
 
     # Redirect back to the frontend dashboard
     return RedirectResponse(settings.frontend_url)
 
 
 @router.get("/accounts", response_model=list[AccountOut])
-async def list_accounts(db: AsyncSession = Depends(get_db)):
+async def list_accounts(db: AsyncSession = Depends(get_read_db)):
     return await account_manager.get_all_accounts(db)
 
 
-@router.put("/accounts/reorder")
+@router.put("/accounts/reorder", response_model=list[AccountOut])
 async def reorder_accounts(
     ordered_ids: list[int],
     db: AsyncSession = Depends(get_db),
 ):
-    await account_manager.reorder_accounts(db, ordered_ids)
-    return {"ok": True}
+    try:
+        return await account_manager.reorder_accounts(db, ordered_ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.delete("/accounts/{account_id}")
@@ -118,4 +118,5 @@ async def remove_account(account_id: int, db: AsyncSession = Depends(get_db)):
     deleted = await account_manager.delete_account(db, account_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Account not found")
+    poller.unwatch(account_id)
     return {"ok": True}
@@ -4,10 +4,10 @@ from urllib.parse import urlencode
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, RedirectResponse
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
 
 from app.config import Settings, get_allowed_emails, get_settings
+from app.services.google_tokens import verify_id_token
+from app.services.http_client import get_client
 from app.session import create_session_token
 
 logger = logging.getLogger(__name__)
@@ -36,32 +36,30 @@ async def google_callback(
     settings: Settings = Depends(get_settings),
 ):
     # Exchange authorization code for tokens
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "code": code,
-                "client_id": settings.google_client_id,
-                "client_secret": settings.google_client_secret,
-                "redirect_uri": settings.google_redirect_uri,
-                "grant_type": "authorization_code",
-            },
-        )
-        if token_resp.status_code != 200:
-            logger.error("Google token exchange failed: %s", token_resp.text)
-            raise HTTPException(status_code=400, detail="Failed to exchange code")
-        token_data = token_resp.json()
+    token_resp = await get_client().post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "code": code,
+            "client_id": settings.google_client_id,
+            "client_secret": settings.google_client_secret,
+            "redirect_uri": settings.google_redirect_uri,
+            "grant_type": "authorization_code",
+        },
+    )
+    if token_resp.status_code != 200:
+        logger.error("Google token exchange failed: %s", token_resp.text)
+        raise HTTPException(status_code=400, detail="Failed to exchange code")
+    token_data = token_resp.json()
 
     # Verify the ID token and extract email
     try:
-        id_info = id_token.verify_oauth2_token(
-            token_data["id_token"],
-            google_requests.Request(),
-            settings.google_client_id,
-        )
+        id_info = await verify_id_token(token_data["id_token"], settings.google_client_id)
     except ValueError:
         logger.exception("ID token verification failed")
         raise HTTPException(status_code=401, detail="Invalid ID token")
+    except httpx.HTTPError:
+        logger.exception("Fetching Google signing certificates failed")
+        raise HTTPException(status_code=502, detail="Could not verify ID token")
 
     email = id_info.get("email", "")
     if email.lower() not in get_allowed_emails():
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db
+from app.models import AccountHistorySummary, PlaybackEventOut
+from app.services import history
+from app.services.account_registry import account_registry
+
+router = APIRouter()
+
+DEFAULT_WINDOW = timedelta(days=7)
+
+
+def _window(since: datetime | None, until: datetime | None) -> tuple[datetime, datetime]:
+    until = until or datetime.now(timezone.utc)
+    return since or until - DEFAULT_WINDOW, until
+
+
+@router.get("/history/summary", response_model=list[AccountHistorySummary])
+async def history_summary(
+    ids: list[int] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    top: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Aggregates per account over [since, until) (default: the last 7 days)."""
+    account_ids = ids if ids is not None else [account.id for account in account_registry.all()]
+    return await history.summarize(db, account_ids, *_window(since, until), top)
+
+
+@router.get("/{account_id}/history", response_model=list[PlaybackEventOut])
+async def account_history(
+    account_id: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """What the account played over [since, until) (default: the last 7 days), newest first."""
+    if account_registry.get(account_id) is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return await history.get_history(db, account_id, *_window(since, until), limit)
@@ -0,0 +1,34 @@
+import httpx
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.config import get_settings
+from app.services.media_cache import IMAGE_ID, Image, cover_cache
+
+router = APIRouter()
+
+# Cover files are content-addressed: the same URL never changes, so browsers may keep it for good
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/cover/{image_id}")
+async def cover(image_id: str, size: int = Query(0, ge=0)):
+    if not IMAGE_ID.fullmatch(image_id):
+        raise HTTPException(status_code=404, detail="Unknown cover")
+    # Only the configured thumbnail size is produced, so the cache can't fill with arbitrary variants
+    if size not in (0, get_settings().media_cover_size):
+        raise HTTPException(status_code=400, detail="Unsupported size")
+    if Image is None:
+        size = 0
+    try:
+        path = await cover_cache.get(image_id, size)
+    except httpx.HTTPStatusError as exc:
+        status = 404 if exc.response.status_code == 404 else 502
+        raise HTTPException(status_code=status, detail="Cover unavailable")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Cover unavailable")
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": IMMUTABLE, "ETag": f'"{image_id}-{size}"'},
+    )
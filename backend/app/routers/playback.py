@@ -1,74 +1,224 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.database import get_db
-from app.models import PlaybackState
-from app.services import account_manager, spotify
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.config import get_settings
+from app.models import TRACK_FIELDS, Account, AccountStateResult, GroupCommand, GroupCommandResult, PlaybackState
+from app.services import spotify
+from app.services.account_registry import account_registry
+from app.services.command_queue import command_queue
+from app.services.poller import next_poll_delay, poller
+from app.services.state_cache import state_cache
+from app.services.track_cache import TrackMetadata, track_cache
 
 router = APIRouter()
 
 
-async def _get_account(account_id: int, db: AsyncSession = Depends(get_db)):
-    account = await account_manager.get_account(db, account_id)
+def _get_account(account_id: int) -> Account:
+    account = account_registry.get(account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     return account
 
 
-@router.get("/{account_id}/state", response_model=PlaybackState)
-async def get_state(
-    account_id: int,
-    db: AsyncSession = Depends(get_db),
-):
-    account = await _get_account(account_id, db)
-    return await spotify.get_playback_state(db, account)
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/stream")
+async def stream(ids: list[int] | None = Query(None)):
+    """Server-Sent Events stream of playback state changes for the given (or all) accounts."""
+    keepalive = get_settings().playback_stream_keepalive_seconds
+    subscription = poller.subscribe(set(ids) if ids is not None else None)
+    queue = subscription.queue
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            poller.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/tracks/{track_id}", response_model=TrackMetadata)
+async def get_track(track_id: str):
+    """Metadata for a track seen in a recent state, for clients using compact states."""
+    track = track_cache.get(track_id)
+    if track is None:
+        raise HTTPException(status_code=404, detail="Track not cached")
+    return track
+
+
+@router.get("/states", response_model=dict[int, AccountStateResult])
+async def get_states(ids: list[int] | None = Query(None), compact: bool = False):
+    """Playback state for many accounts at once; failures are reported per account.
+
+    With ``compact``, states carry ``track_id`` instead of the track's names and cover.
+    """
+    settings = get_settings()
+    accounts = account_registry.all()
+    if ids is not None:
+        wanted = set(ids)
+        accounts = [account for account in accounts if account.id in wanted]
+    semaphore = asyncio.Semaphore(settings.playback_batch_concurrency)
+
+    async def fetch_one(account: Account) -> AccountStateResult:
+        async with semaphore:
+            try:
+                state = await asyncio.wait_for(
+                    state_cache.get_or_fetch(
+                        account.id, lambda: spotify.get_playback_state(account)
+                    ),
+                    timeout=settings.playback_batch_timeout_seconds,
+                )
+            except TimeoutError:
+                return AccountStateResult(error="Timed out")
+            except Exception as exc:
+                return AccountStateResult(error=str(exc) or type(exc).__name__)
+        return AccountStateResult(state=state, next_poll_after_ms=round(next_poll_delay(state) * 1000))
+
+    results = await asyncio.gather(*(fetch_one(account) for account in accounts))
+    states = {account.id: result for account, result in zip(accounts, results)}
+    for missing_id in set(ids or ()) - states.keys():
+        states[missing_id] = AccountStateResult(error="Account not found")
+    if compact:
+        return JSONResponse({
+            account_id: result.model_dump(mode="json", exclude={"state": TRACK_FIELDS})
+            for account_id, result in states.items()
+        })
+    return states
+
+
+@router.get(
+    "/{account_id}/state",
+    response_model=PlaybackState,
+    responses={304: {"description": "Unchanged apart from playback progress since If-None-Match"}},
+)
+async def get_state(account_id: int, if_none_match: str | None = Header(None), compact: bool = False):
+    account = _get_account(account_id)
+    state = await state_cache.get_or_fetch(
+        account.id, lambda: spotify.get_playback_state(account)
+    )
+    etag = state.etag(compact)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Next-Poll-After-Ms": str(round(next_poll_delay(state) * 1000)),
+    }
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    body = state.model_dump_json(exclude=TRACK_FIELDS if compact else None)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _run_command(account: Account, command: str, value: int | None = None) -> bool:
+    """Queue a control command for the account; returns True if a newer one superseded it."""
+    return await command_queue.submit(
+        account.id, command, value, lambda latest: _send_command(account, command, latest)
+    )
+
+
+async def _send_command(account: Account, command: str, value: int | None) -> None:
+    if command == "play":
+        await spotify.play(account)
+    elif command == "pause":
+        await spotify.pause(account)
+    elif command == "volume":
+        await spotify.set_volume(account, value)
+    elif command == "seek":
+        await spotify.seek(account, value)
+    elif command == "next":
+        await spotify.next_track(account)
+    elif command == "previous":
+        await spotify.previous_track(account)
+    else:
+        raise ValueError(f"Unknown command: {command}")
+
+
+def _command_response(account_id: int, coalesced: bool) -> dict:
+    # The service layer has already applied the command's expected effect to the cache
+    return {"ok": True, "coalesced": coalesced, "state": state_cache.get(account_id)}
+
+
+@router.post("/group", response_model=list[GroupCommandResult])
+async def group_command(body: GroupCommand):
+    """Apply one command to many accounts concurrently, reporting each outcome."""
+    if body.account_ids is None:
+        targets = [(account.id, account) for account in account_registry.all()]
+    else:
+        targets = [(account_id, account_registry.get(account_id)) for account_id in dict.fromkeys(body.account_ids)]
+    semaphore = asyncio.Semaphore(get_settings().playback_batch_concurrency)
+
+    async def run_one(account_id: int, account: Account | None) -> GroupCommandResult:
+        if account is None:
+            return GroupCommandResult(account_id=account_id, ok=False, error="Account not found", latency_ms=0)
+        async with semaphore:
+            start = time.perf_counter()
+            coalesced, error = False, None
+            try:
+                coalesced = await _run_command(account, body.command, body.value)
+            except Exception as exc:
+                error = str(exc) or type(exc).__name__
+            latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        return GroupCommandResult(
+            account_id=account.id, ok=error is None, error=error, coalesced=coalesced, latency_ms=latency_ms
+        )
+
+    return await asyncio.gather(*(run_one(account_id, account) for account_id, account in targets))
 
 
 @router.put("/{account_id}/play")
-async def play(account_id: int, db: AsyncSession = Depends(get_db)):
-    account = await _get_account(account_id, db)
-    await spotify.play(db, account)
-    return {"ok": True}
+async def play(account_id: int):
+    coalesced = await _run_command(_get_account(account_id), "play")
+    return _command_response(account_id, coalesced)
 
 
 @router.put("/{account_id}/pause")
-async def pause(account_id: int, db: AsyncSession = Depends(get_db)):
-    account = await _get_account(account_id, db)
-    await spotify.pause(db, account)
-    return {"ok": True}
+async def pause(account_id: int):
+    coalesced = await _run_command(_get_account(account_id), "pause")
+    return _command_response(account_id, coalesced)
 
 
 @router.put("/{account_id}/volume")
 async def volume(
     account_id: int,
     level: int = Query(..., ge=0, le=100),
-    db: AsyncSession = Depends(get_db),
 ):
-    account = await _get_account(account_id, db)
-    await spotify.set_volume(db, account, level)
-    return {"ok": True}
+    coalesced = await _run_command(_get_account(account_id), "volume", level)
+    return _command_response(account_id, coalesced)
 
 
 @router.put("/{account_id}/seek")
 async def seek(
     account_id: int,
     position_ms: int = Query(..., ge=0),
-    db: AsyncSession = Depends(get_db),
 ):
-    account = await _get_account(account_id, db)
-    await spotify.seek(db, account, position_ms)
-    return {"ok": True}
+    coalesced = await _run_command(_get_account(account_id), "seek", position_ms)
+    return _command_response(account_id, coalesced)
 
 
 @router.post("/{account_id}/next")
-async def next_track(account_id: int, db: AsyncSession = Depends(get_db)):
-    account = await _get_account(account_id, db)
-    await spotify.next_track(db, account)
-    return {"ok": True}
+async def next_track(account_id: int):
+    coalesced = await _run_command(_get_account(account_id), "next")
+    return _command_response(account_id, coalesced)
 
 
 @router.post("/{account_id}/previous")
-async def previous_track(account_id: int, db: AsyncSession = Depends(get_db)):
-    account = await _get_account(account_id, db)
-    await spotify.previous_track(db, account)
-    return {"ok": True}
+async def previous_track(account_id: int):
+    coalesced = await _run_command(_get_account(account_id), "previous")
+    return _command_response(account_id, coalesced)
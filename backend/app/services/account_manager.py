@@ -1,9 +1,11 @@
 from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import case, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Account
+from app.services.account_registry import ACCOUNTS_CHANNEL, ALL_ACCOUNTS, account_registry
+from app.services.pubsub import notify
 
 
 async def get_all_accounts(db: AsyncSession) -> list[Account]:
@@ -11,12 +13,28 @@ async def get_all_accounts(db: AsyncSession) -> list[Account]:
     return result.scalars().all()
 
 
-async def reorder_accounts(db: AsyncSession, ordered_ids: list[int]) -> None:
-    for position, account_id in enumerate(ordered_ids):
-        account = await db.get(Account, account_id)
-        if account:
-            account.sort_order = position
+async def reorder_accounts(db: AsyncSession, ordered_ids: list[int]) -> list[Account]:
+    """Set every account's sort_order in one UPDATE; ids must list each account exactly once."""
+    existing = set((await db.execute(select(Account.id))).scalars())
+    if len(set(ordered_ids)) != len(ordered_ids) or set(ordered_ids) != existing:
+        raise ValueError("ordered_ids must list every account exactly once")
+    if not ordered_ids:
+        return []
+
+    positions = {account_id: position for position, account_id in enumerate(ordered_ids)}
+    result = await db.scalars(
+        update(Account)
+        .where(Account.id.in_(ordered_ids))
+        .values(sort_order=case(positions, value=Account.id))
+        .returning(Account)
+        .execution_options(synchronize_session=False)
+    )
+    accounts = sorted(result.all(), key=lambda a: a.sort_order)
+    await notify(db, ACCOUNTS_CHANNEL, ALL_ACCOUNTS)
     await db.commit()
+    for account in accounts:
+        account_registry.put(account)
+    return accounts
 
 
 async def get_account(db: AsyncSession, account_id: int) -> Account | None:
@@ -53,8 +71,11 @@ async def upsert_account(
             token_expires_at=token_expires_at,
         )
         db.add(account)
+        await db.flush()
+    await notify(db, ACCOUNTS_CHANNEL, str(account.id))
     await db.commit()
     await db.refresh(account)
+    account_registry.put(account)
     return account
 
 
@@ -63,7 +84,9 @@ async def delete_account(db: AsyncSession, account_id: int) -> bool:
     if not account:
         return False
     await db.delete(account)
+    await notify(db, ACCOUNTS_CHANNEL, str(account_id))
     await db.commit()
+    account_registry.remove(account_id)
     return True
 
 
@@ -78,4 +101,6 @@ async def update_tokens(
     account.token_expires_at = token_expires_at
     if refresh_token:
         account.refresh_token = refresh_token
+    await notify(db, ACCOUNTS_CHANNEL, str(account.id))
     await db.commit()
+    account_registry.put(account)
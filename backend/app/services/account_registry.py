@@ -0,0 +1,76 @@
+import logging
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import Account
+from app.services.pubsub import listener
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_CHANNEL = "accounts_changed"
+ALL_ACCOUNTS = "*"
+
+
+def _detached_copy(account: Account) -> Account:
+    return Account(
+        id=account.id,
+        spotify_user_id=account.spotify_user_id,
+        display_name=account.display_name,
+        access_token=account.access_token,
+        refresh_token=account.refresh_token,
+        token_expires_at=account.token_expires_at,
+        sort_order=account.sort_order,
+    )
+
+
+class AccountRegistry:
+    """Process-local copy of the accounts table, so the playback hot path skips the DB.
+
+    Kept current by account_manager on every write. Writes made by other
+    instances arrive as NOTIFYs on ``accounts_changed`` (payload: account id,
+    or ``*`` for a full reload).
+    """
+
+    def __init__(self) -> None:
+        self._accounts: dict[int, Account] = {}
+
+    async def start(self) -> None:
+        await self.reload_all()
+        listener.on(ACCOUNTS_CHANNEL, self._on_notification)
+        listener.on_reconnect(self.reload_all)
+
+    def get(self, account_id: int) -> Account | None:
+        return self._accounts.get(account_id)
+
+    def all(self) -> list[Account]:
+        return sorted(self._accounts.values(), key=lambda a: a.sort_order)
+
+    def put(self, account: Account) -> None:
+        self._accounts[account.id] = _detached_copy(account)
+
+    def remove(self, account_id: int) -> None:
+        self._accounts.pop(account_id, None)
+
+    async def reload_all(self) -> None:
+        async with async_session() as db:
+            result = await db.execute(select(Account))
+            self._accounts = {a.id: _detached_copy(a) for a in result.scalars()}
+        logger.info("Loaded %d account(s) into the registry", len(self._accounts))
+
+    async def reload(self, account_id: int) -> None:
+        async with async_session() as db:
+            account = await db.get(Account, account_id)
+        if account is None:
+            self.remove(account_id)
+        else:
+            self.put(account)
+
+    async def _on_notification(self, payload: str) -> None:
+        if payload == ALL_ACCOUNTS:
+            await self.reload_all()
+        else:
+            await self.reload(int(payload))
+
+
+account_registry = AccountRegistry()
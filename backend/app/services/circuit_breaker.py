@@ -0,0 +1,93 @@
+import logging
+import time
+
+from app.config import get_settings
+from app.metrics import CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Spotify is failing for {endpoint}, retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream endpoint, so callers fail fast instead of queueing.
+
+    After ``threshold`` consecutive failures (transport errors or 5xx) the
+    circuit opens and calls raise CircuitOpen without touching the network.
+    Once ``reset_seconds`` have passed, a single probe call is let through:
+    success closes the circuit, failure keeps it open for another period.
+    """
+
+    def __init__(self, endpoint: str, threshold: int, reset_seconds: float) -> None:
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen if the call may not be sent; returns whether it is the probe."""
+        if self._opened_at is None:
+            return False
+        now = time.monotonic()
+        remaining = self._opened_at + self.reset_seconds - now
+        # A probe that never reported back (e.g. cancelled) frees its slot after a period
+        probing = self._probe_started is not None and now - self._probe_started < self.reset_seconds
+        if remaining > 0 or probing:
+            raise CircuitOpen(self.endpoint, max(remaining, 1.0))
+        self._probe_started = now
+        return True
+
+    def cancel_probe(self) -> None:
+        """Free the probe slot for a call that was never sent."""
+        self._probe_started = None
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_started = None
+        if self._opened_at is not None:
+            self._opened_at = None
+            CIRCUIT_OPEN.labels(self.endpoint).set(0)
+            logger.info("Circuit for %s closed", self.endpoint)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_started = None
+        if self._opened_at is not None or self._failures >= self.threshold:
+            if self._opened_at is None:
+                CIRCUIT_OPEN.labels(self.endpoint).set(1)
+                logger.warning("Circuit for %s opened after %d failures", self.endpoint, self._failures)
+            self._opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """One breaker per upstream endpoint (method + path), created on first use."""
+
+    def __init__(self) -> None:
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                endpoint, settings.spotify_circuit_failure_threshold, settings.spotify_circuit_reset_seconds
+            )
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def open_endpoints(self) -> list[str]:
+        return [endpoint for endpoint, breaker in self._breakers.items() if breaker.is_open]
+
+
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+
+COALESCABLE = frozenset({"volume", "seek"})
+
+Send = Callable[[int | None], Awaitable[None]]
+
+
+@dataclass
+class _Entry:
+    command: str
+    value: int | None
+    send: Send
+    waiters: list[asyncio.Future[bool]] = field(default_factory=list)
+    started: bool = False
+
+
+class CommandQueue:
+    """Runs each account's control commands one at a time, in arrival order.
+
+    A volume or seek arriving while an earlier one of the same kind is still
+    queued at the tail replaces its value instead of queueing behind it, and
+    same-kind sends are spaced at least ``command_coalesce_window_ms`` apart.
+    Slider drags therefore reach Spotify as a few calls carrying the latest
+    value, while discrete commands like play or next keep their order.
+    """
+
+    def __init__(self) -> None:
+        self._queues: dict[int, deque[_Entry]] = {}
+        self._workers: dict[int, asyncio.Task[None]] = {}
+        self._last_sent: dict[tuple[int, str], float] = {}
+
+    async def submit(self, account_id: int, command: str, value: int | None, send: Send) -> bool:
+        """Queue a command and wait until it's sent; returns True if a newer value superseded it."""
+        queue = self._queues.setdefault(account_id, deque())
+        waiter: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+
+        tail = queue[-1] if queue else None
+        if command in COALESCABLE and tail and tail.command == command and not tail.started:
+            tail.value = value
+            tail.send = send
+            tail.waiters.append(waiter)
+        else:
+            queue.append(_Entry(command, value, send, [waiter]))
+
+        if account_id not in self._workers:
+            self._workers[account_id] = asyncio.create_task(self._drain(account_id))
+        return await waiter
+
+    async def _drain(self, account_id: int) -> None:
+        window = get_settings().command_coalesce_window_ms / 1000
+        queue = self._queues[account_id]
+        try:
+            while queue:
+                entry = queue[0]
+                if entry.command in COALESCABLE:
+                    last_sent = self._last_sent.get((account_id, entry.command), 0.0)
+                    delay = last_sent + window - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                entry.started = True
+                error: Exception | None = None
+                try:
+                    await entry.send(entry.value)
+                except Exception as exc:
+                    error = exc
+                if entry.command in COALESCABLE:
+                    self._last_sent[(account_id, entry.command)] = time.monotonic()
+                queue.popleft()
+                self._resolve(entry, error)
+        finally:
+            del self._workers[account_id]
+            if not queue:
+                del self._queues[account_id]
+
+    @staticmethod
+    def _resolve(entry: _Entry, error: Exception | None) -> None:
+        latest = len(entry.waiters) - 1
+        for index, waiter in enumerate(entry.waiters):
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(index < latest)
+
+
+command_queue = CommandQueue()
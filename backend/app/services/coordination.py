@@ -0,0 +1,213 @@
+"""Coordination between workers and instances that share one database.
+
+Each account is polled by at most one worker: the one holding its Postgres
+advisory lock, taken by whichever worker first needs to poll the account and
+released when it stops. The proactive token refresh sweep runs only on the
+worker holding the leader lock, and a refresh itself holds a per-account
+transaction lock so two workers never spend the same refresh token at once.
+States a worker stores are shared with the others over NOTIFY, so viewers on
+every worker see them without each one polling Spotify.
+
+Locks are session-level on the LISTEN connection: if a worker dies or loses
+that connection, Postgres releases its locks and another worker takes over on
+its next claim. Without Postgres (or while disconnected) every worker acts on
+its own, exactly as a single process would.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import PlaybackState
+from app.services.pubsub import listener
+from app.services.state_cache import state_cache
+from app.services.track_cache import track_cache
+
+logger = logging.getLogger(__name__)
+
+STATE_CHANNEL = "playback_state"
+# First key of the two-int advisory lock functions; arbitrary, but unique to this app
+POLL_LOCK_NAMESPACE = 7301
+LEADER_LOCK_NAMESPACE = 7302
+TOKEN_LOCK_NAMESPACE = 7303
+# A progress_ms further than this from what extrapolation predicts (e.g. after a seek) is news
+PROGRESS_TOLERANCE_MS = 1500
+
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+_DB_ERRORS = (ConnectionError, OSError, asyncpg.PostgresError)
+
+
+def _differs(old: PlaybackState, new: PlaybackState) -> bool:
+    if old.etag() != new.etag():
+        return True
+    expected = old.progress_ms + (new.timestamp_ms - old.timestamp_ms if old.is_playing else 0)
+    return abs(new.progress_ms - expected) > PROGRESS_TOLERANCE_MS
+
+
+async def lock_token_refresh(db: AsyncSession, account_id: int) -> None:
+    """Hold the account's refresh lock until ``db``'s transaction ends (no-op off Postgres)."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(TOKEN_LOCK_NAMESPACE, account_id)))
+
+
+class Coordinator:
+    def __init__(self) -> None:
+        self._owned: set[int] = set()
+        self._leader = False
+        self._last_attempt: dict[tuple[int, int], float] = {}
+        self._shared: dict[int, tuple[PlaybackState, float]] = {}
+        self._outbox: dict[int, str] = {}
+        self._outbox_ready = asyncio.Event()
+        self._sender: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Set while storing another worker's state, so it isn't shared back
+        self.applying_remote = False
+
+    def start(self) -> None:
+        # Registered before the listener connects, like the account registry's channel
+        listener.on(STATE_CHANNEL, self._on_remote_state)
+        listener.on_disconnect(self._on_disconnect)
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *([self._sender] if self._sender else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._sender = None
+
+    @property
+    def distributed(self) -> bool:
+        return get_settings().coordination_enabled and listener.connected
+
+    async def claim(self, account_id: int) -> bool:
+        """Whether this worker should poll the account, taking it over if no one else does."""
+        if not self.distributed or account_id in self._owned:
+            return True
+        if await self._try_lock(POLL_LOCK_NAMESPACE, account_id):
+            self._owned.add(account_id)
+            return True
+        return False
+
+    def owns(self, account_id: int) -> bool:
+        """Whether this worker currently polls the account (always, when running alone)."""
+        return not self.distributed or account_id in self._owned
+
+    def release(self, account_id: int) -> None:
+        """Stop polling the account here, letting another worker claim it."""
+        if account_id in self._owned:
+            self._owned.discard(account_id)
+            self._spawn(self._unlock(POLL_LOCK_NAMESPACE, account_id))
+
+    async def is_leader(self) -> bool:
+        """Whether this worker runs the app-wide background jobs (the token refresh sweep)."""
+        if not self.distributed:
+            return True
+        if not self._leader:
+            self._leader = await self._try_lock(LEADER_LOCK_NAMESPACE, 0)
+        return self._leader
+
+    def share(self, account_id: int, state: PlaybackState, next_store_in: float) -> None:
+        """Send a state stored here to the other workers, if it's news to them.
+
+        Unchanged states are still resent every ``coordination_republish_seconds``
+        so the copies elsewhere stay fresh; ``next_store_in`` is when this worker
+        expects to store the account's state again.
+        """
+        if self.applying_remote or not self.distributed:
+            return
+        settings = get_settings()
+        now = time.monotonic()
+        previous = self._shared.get(account_id)
+        if (
+            previous is not None
+            and now - previous[1] < settings.coordination_republish_seconds
+            and not _differs(previous[0], state)
+        ):
+            return
+        self._shared[account_id] = (state, now)
+        ttl = max(next_store_in, settings.coordination_republish_seconds) + settings.playback_poll_interval_seconds
+        self._outbox[account_id] = json.dumps({
+            "origin": INSTANCE_ID,
+            "account_id": account_id,
+            "ttl": ttl,
+            "state": state.model_dump(mode="json"),
+        })
+        self._outbox_ready.set()
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            # Only the latest state per account is sent; one round trip for the batch
+            payloads, self._outbox = list(self._outbox.values()), {}
+            try:
+                await listener.fetchval(
+                    "SELECT count(pg_notify($1, payload)) FROM unnest($2::text[]) AS payload",
+                    STATE_CHANNEL,
+                    payloads,
+                )
+            except _DB_ERRORS as exc:
+                logger.warning("Sharing %d playback state(s) failed: %s", len(payloads), exc)
+
+    async def _on_remote_state(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == INSTANCE_ID:
+            return
+        account_id = message["account_id"]
+        state = PlaybackState.model_validate(message["state"])
+        # Compact states served here refer to the track by id, so its metadata must be here too
+        track_cache.from_state(state)
+        # The owner keeps its normal TTL so its own polling isn't put off
+        ttl = None if account_id in self._owned else message["ttl"]
+        self.applying_remote = True
+        try:
+            state_cache.set(account_id, state, ttl=ttl)
+        finally:
+            self.applying_remote = False
+
+    def _on_disconnect(self) -> None:
+        # Postgres released every session lock with the connection
+        self._owned.clear()
+        self._leader = False
+        self._last_attempt.clear()
+
+    async def _try_lock(self, namespace: int, key: int) -> bool:
+        # Failed claims are retried at most once per interval, to spare the connection
+        now = time.monotonic()
+        last = self._last_attempt.get((namespace, key))
+        if last is not None and now - last < get_settings().coordination_claim_interval_seconds:
+            return False
+        self._last_attempt[(namespace, key)] = now
+        try:
+            acquired = await listener.fetchval("SELECT pg_try_advisory_lock($1, $2)", namespace, key)
+        except _DB_ERRORS as exc:
+            logger.warning("Advisory lock %s/%s failed: %s", namespace, key, exc)
+            return False
+        if acquired:
+            del self._last_attempt[(namespace, key)]
+        return bool(acquired)
+
+    async def _unlock(self, namespace: int, key: int) -> None:
+        try:
+            await listener.fetchval("SELECT pg_advisory_unlock($1, $2)", namespace, key)
+        except _DB_ERRORS as exc:
+            logger.warning("Advisory unlock %s/%s failed: %s", namespace, key, exc)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+coordinator = Coordinator()
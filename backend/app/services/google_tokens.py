@@ -0,0 +1,92 @@
+"""Google ID token verification without blocking the event loop.
+
+google.oauth2.id_token.verify_oauth2_token downloads Google's signing
+certificates with a synchronous request on every call. Here the certificates
+are fetched with the shared async client and kept until their Cache-Control
+max-age runs out; only the signature check runs in a worker thread.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import re
+import time
+
+from app.services.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = frozenset({"accounts.google.com", "https://accounts.google.com"})
+DEFAULT_CERTS_MAX_AGE = 3600
+# An unknown key id refetches early (Google rotated keys), but at most this often,
+# so forged tokens can't make every request hit Google
+MIN_REFETCH_INTERVAL = 60
+CLOCK_SKEW_SECONDS = 10
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _key_id(token: str) -> str | None:
+    try:
+        segment = token.split(".", 1)[0]
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except ValueError:
+        return None
+    return header.get("kid") if isinstance(header, dict) else None
+
+
+class GoogleCertCache:
+    """Google's current signing certificates (key id -> PEM), refreshed per Cache-Control."""
+
+    def __init__(self) -> None:
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def get(self, key_id: str | None = None) -> dict[str, str]:
+        """Return the certificates, refetching when stale or when ``key_id`` is unknown (key rotation)."""
+        if self._fresh(key_id):
+            return self._certs
+        async with self._lock:
+            # Another login may have refreshed them while we waited
+            if not self._fresh(key_id):
+                await self._fetch()
+        return self._certs
+
+    def _fresh(self, key_id: str | None) -> bool:
+        now = time.monotonic()
+        if now >= self._expires_at:
+            return False
+        return key_id is None or key_id in self._certs or now - self._fetched_at < MIN_REFETCH_INTERVAL
+
+    async def _fetch(self) -> None:
+        resp = await get_client().get(GOOGLE_CERTS_URL)
+        resp.raise_for_status()
+        match = _MAX_AGE.search(resp.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+        self._certs = resp.json()
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+        logger.info("Fetched %d Google signing certificate(s), cached for %ds", len(self._certs), max_age)
+
+
+cert_cache = GoogleCertCache()
+
+
+async def verify_id_token(token: str, audience: str) -> dict:
+    """Verify a Google ID token's signature, audience, expiry and issuer; raises ValueError if invalid."""
+    certs = await cert_cache.get(_key_id(token))
+    id_info = await asyncio.to_thread(_decode, token, certs, audience)
+    if id_info.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+    return id_info
+
+
+def _decode(token: str, certs: dict[str, str], audience: str) -> dict:
+    # Imported on first login rather than at startup, like the rest of google-auth
+    from google.auth import jwt
+
+    return jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
@@ -0,0 +1,189 @@
+"""Playback history: transitions seen by polling, buffered and written in batches.
+
+Only states fetched from Spotify are compared, against the previous fetched
+state for the same account (not optimistic predictions, which would hide the
+transition they predict). The first state seen after startup is a baseline
+and isn't recorded, so restarts don't log the current track twice. Writes
+never happen on the request path: events go into a bounded in-memory buffer
+that a background task flushes as multi-row INSERTs.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session
+from app.metrics import HISTORY_EVENTS
+from app.models import AccountHistorySummary, PlaybackEvent, PlaybackState, TrackPlays
+from app.services.account_registry import account_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _transitions(old: PlaybackState, new: PlaybackState) -> list[str]:
+    kinds = []
+    if new.track_name and (new.track_id, new.track_name) != (old.track_id, old.track_name):
+        kinds.append("track")
+    if new.is_playing != old.is_playing:
+        kinds.append("play" if new.is_playing else "pause")
+    if new.device_name != old.device_name and new.device_name is not None:
+        kinds.append("device")
+    return kinds
+
+
+class PlaybackHistoryRecorder:
+    def __init__(self) -> None:
+        self._last: dict[int, PlaybackState] = {}
+        self._buffer: list[dict] = []
+        self._flush_now = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if get_settings().history_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.flush()
+
+    def observe(self, account_id: int, state: PlaybackState) -> None:
+        """Record the transitions from the account's previous fetched state; never blocks."""
+        if self._task is None:
+            return
+        previous = self._last.get(account_id)
+        self._last[account_id] = state
+        if previous is None:
+            return
+        settings = get_settings()
+        occurred_at = datetime.fromtimestamp(state.timestamp_ms / 1000, timezone.utc)
+        for kind in _transitions(previous, state):
+            if len(self._buffer) >= settings.history_buffer_max:
+                HISTORY_EVENTS.labels("dropped").inc()
+                continue
+            self._buffer.append({
+                "account_id": account_id,
+                "occurred_at": occurred_at,
+                "kind": kind,
+                "track_id": state.track_id,
+                "track_name": state.track_name,
+                "artist_name": state.artist_name,
+                "album_name": state.album_name,
+                "device_name": state.device_name,
+                "progress_ms": state.progress_ms,
+                "duration_ms": state.duration_ms,
+            })
+        if len(self._buffer) >= settings.history_batch_size:
+            self._flush_now.set()
+
+    def forget(self, account_id: int) -> None:
+        self._last.pop(account_id, None)
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, one multi-row INSERT per batch."""
+        batch_size = get_settings().history_batch_size
+        rows, self._buffer = self._buffer, []
+        # Accounts deleted since would fail the foreign key for the whole batch
+        rows = [row for row in rows if account_registry.get(row["account_id"]) is not None]
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            try:
+                async with async_session() as db:
+                    await db.execute(insert(PlaybackEvent).values(batch))
+                    await db.commit()
+            except (SQLAlchemyError, OSError):
+                logger.exception("Writing %d playback event(s) failed; dropping them", len(batch))
+                HISTORY_EVENTS.labels("dropped").inc(len(batch))
+            else:
+                HISTORY_EVENTS.labels("recorded").inc(len(batch))
+
+    async def _run(self) -> None:
+        interval = get_settings().history_flush_interval_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=interval)
+            except TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+
+history_recorder = PlaybackHistoryRecorder()
+
+
+async def get_history(
+    db: AsyncSession, account_id: int, since: datetime, until: datetime, limit: int
+) -> list[PlaybackEvent]:
+    """The account's events in [since, until), newest first."""
+    result = await db.execute(
+        select(PlaybackEvent)
+        .where(
+            PlaybackEvent.account_id == account_id,
+            PlaybackEvent.occurred_at >= since,
+            PlaybackEvent.occurred_at < until,
+        )
+        .order_by(PlaybackEvent.occurred_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def summarize(
+    db: AsyncSession, account_ids: list[int], since: datetime, until: datetime, top: int
+) -> list[AccountHistorySummary]:
+    """Per-account event counts, distinct tracks and most played tracks in [since, until)."""
+    in_range = (
+        PlaybackEvent.account_id.in_(account_ids),
+        PlaybackEvent.occurred_at >= since,
+        PlaybackEvent.occurred_at < until,
+    )
+    summaries = {
+        account_id: AccountHistorySummary(account_id=account_id, events={}, distinct_tracks=0, top_tracks=[])
+        for account_id in account_ids
+    }
+
+    counts = await db.execute(
+        select(PlaybackEvent.account_id, PlaybackEvent.kind, func.count())
+        .where(*in_range)
+        .group_by(PlaybackEvent.account_id, PlaybackEvent.kind)
+    )
+    for account_id, kind, count in counts:
+        summaries[account_id].events[kind] = count
+
+    distinct = await db.execute(
+        select(PlaybackEvent.account_id, func.count(PlaybackEvent.track_id.distinct()))
+        .where(*in_range, PlaybackEvent.kind == "track")
+        .group_by(PlaybackEvent.account_id)
+    )
+    for account_id, count in distinct:
+        summaries[account_id].distinct_tracks = count
+
+    plays = func.count().label("plays")
+    ranked = (
+        select(
+            PlaybackEvent.account_id,
+            PlaybackEvent.track_id,
+            PlaybackEvent.track_name,
+            PlaybackEvent.artist_name,
+            plays,
+            func.row_number().over(partition_by=PlaybackEvent.account_id, order_by=plays.desc()).label("rank"),
+        )
+        .where(*in_range, PlaybackEvent.kind == "track")
+        .group_by(
+            PlaybackEvent.account_id, PlaybackEvent.track_id, PlaybackEvent.track_name, PlaybackEvent.artist_name
+        )
+        .subquery()
+    )
+    top_rows = await db.execute(select(ranked).where(ranked.c.rank <= top).order_by(ranked.c.account_id, ranked.c.rank))
+    for row in top_rows:
+        summaries[row.account_id].top_tracks.append(
+            TrackPlays(track_id=row.track_id, track_name=row.track_name, artist_name=row.artist_name, plays=row.plays)
+        )
+    return list(summaries.values())
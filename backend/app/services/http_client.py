@@ -0,0 +1,64 @@
+import logging
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+_transport: httpx.AsyncBaseTransport | None = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.spotify_max_connections,
+        max_keepalive_connections=settings.spotify_max_keepalive_connections,
+        keepalive_expiry=settings.spotify_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        settings.spotify_read_timeout,
+        connect=settings.spotify_connect_timeout,
+        pool=settings.spotify_pool_timeout,
+    )
+    http2 = settings.spotify_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("h2 is not installed — falling back to HTTP/1.1 for Spotify calls")
+            http2 = False
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, transport=_transport)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the app-lifetime client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def use_transport(transport: httpx.AsyncBaseTransport | None) -> None:
+    """Route all outbound calls through ``transport`` (e.g. an ASGITransport to a fake Spotify)."""
+    global _transport
+    await close_client()
+    _transport = transport
+
+
+async def prewarm(*urls: str, timeout: float = 2.0) -> None:
+    """Open connections to ``urls`` ahead of the first real call; failures are only logged."""
+    client = get_client()
+    for url in urls:
+        try:
+            await client.head(url, timeout=timeout)
+        except httpx.HTTPError as exc:
+            logger.info("Pre-warming %s failed: %s", url, exc)
@@ -0,0 +1,150 @@
+"""Album covers fetched once, stored on disk and served as small thumbnails.
+
+Spotify cover URLs look like https://i.scdn.co/image/<id>, where the id is
+already a content hash, so the id doubles as the cache key and a cached file
+never goes stale. Files are named <id>-<size>.jpg (size 0 = the original)
+and evicted least-recently-used once the directory exceeds its byte budget.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from app.config import get_settings
+from app.metrics import MEDIA_CACHE_REQUESTS
+from app.services.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_IMAGE_PREFIX = "https://i.scdn.co/image/"
+IMAGE_ID = re.compile(r"[0-9a-f]{16,64}")
+# Source image asked of Spotify: the smallest cover at least this wide (Spotify offers 640/300/64)
+SOURCE_MIN_WIDTH = 300
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: without Pillow covers are served at their original size
+    Image = None
+
+
+def choose_cover(images: list[dict]) -> str | None:
+    """URL of the smallest Spotify album image that is still wide enough to thumbnail."""
+    if not images:
+        return None
+    wide_enough = [img for img in images if (img.get("width") or 0) >= SOURCE_MIN_WIDTH]
+    if wide_enough:
+        return min(wide_enough, key=lambda img: img["width"])["url"]
+    return images[0]["url"]
+
+
+def cover_url(url: str | None) -> str | None:
+    """Rewrite a Spotify image URL to its /media/cover path; other URLs pass through."""
+    settings = get_settings()
+    if not url or not settings.media_proxy_enabled or not url.startswith(SPOTIFY_IMAGE_PREFIX):
+        return url
+    image_id = url.removeprefix(SPOTIFY_IMAGE_PREFIX)
+    if not IMAGE_ID.fullmatch(image_id):
+        return url
+    size = settings.media_cover_size if Image is not None else 0
+    return f"/media/cover/{image_id}?size={size}" if size else f"/media/cover/{image_id}"
+
+
+def _thumbnail(data: bytes, size: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB")
+        img.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Readers never see a partial file; the temp name is unique because a thumbnail fill
+    # can store the original while a size-0 fill of the same cover writes it too
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class CoverCache:
+    """Bounded on-disk LRU of cover images; concurrent misses share one fetch."""
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files: OrderedDict[str, int] | None = None
+        self._total = 0
+        self._inflight: dict[str, asyncio.Task[Path]] = {}
+
+    def _index(self) -> OrderedDict[str, int]:
+        """Sizes of cached files, least recently used first; built from the directory on first use."""
+        if self._files is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".jpg")),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+            self._files = OrderedDict((entry.name, entry.stat().st_size) for entry in entries)
+            self._total = sum(self._files.values())
+        return self._files
+
+    async def get(self, image_id: str, size: int) -> Path:
+        """Path to the cached file for this cover and size, fetching/resizing it on a miss."""
+        name = f"{image_id}-{size}.jpg"
+        files = self._index()
+        if name in files and (self.directory / name).is_file():
+            files.move_to_end(name)
+            MEDIA_CACHE_REQUESTS.labels("hit").inc()
+            return self.directory / name
+
+        task = self._inflight.get(name)
+        if task is None:
+            MEDIA_CACHE_REQUESTS.labels("miss").inc()
+            task = asyncio.create_task(self._fill(image_id, size, name))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return await asyncio.shield(task)
+
+    async def _fill(self, image_id: str, size: int, name: str) -> Path:
+        original = f"{image_id}-0.jpg"
+        if size and original in self._index() and (self.directory / original).is_file():
+            data = await asyncio.to_thread((self.directory / original).read_bytes)
+        else:
+            resp = await get_client().get(SPOTIFY_IMAGE_PREFIX + image_id)
+            resp.raise_for_status()
+            data = resp.content
+            if size:
+                await self._store(original, data)
+        if size:
+            try:
+                data = await asyncio.to_thread(_thumbnail, data, size)
+            except (OSError, Image.DecompressionBombError) as exc:
+                # Undecodable source: cache the original under this size so it isn't retried per request
+                logger.warning("Could not thumbnail cover %s, serving the original: %s", image_id, exc)
+        return await self._store(name, data)
+
+    async def _store(self, name: str, data: bytes) -> Path:
+        path = self.directory / name
+        await asyncio.to_thread(_write_atomic, path, data)
+
+        files = self._index()
+        self._total += len(data) - files.pop(name, 0)
+        files[name] = len(data)
+        while self._total > self.max_bytes and len(files) > 1:
+            evicted, evicted_size = files.popitem(last=False)
+            self._total -= evicted_size
+            (self.directory / evicted).unlink(missing_ok=True)
+        return path
+
+
+cover_cache = CoverCache(get_settings().media_cache_dir, get_settings().media_cache_max_bytes)
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+from app.models import Account, PlaybackState
+from app.services import spotify
+from app.services.account_registry import account_registry
+from app.services.coordination import coordinator
+from app.services.history import history_recorder
+from app.services.state_cache import state_cache
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Changes that move an account to a different polling cadence
+CADENCE_FIELDS = frozenset({"is_playing", "device_name", "duration_ms"})
+
+
+def next_poll_delay(state: PlaybackState | None) -> float:
+    """Seconds until the account's state is worth fetching again.
+
+    Fast near the end of a track so the next one shows up promptly, slow while
+    paused, slower still with no active device.
+    """
+    settings = get_settings()
+    if state is None:
+        return settings.playback_poll_interval_seconds
+    if not state.is_playing:
+        if state.device_name is None:
+            return settings.playback_poll_no_device_seconds
+        return settings.playback_poll_paused_seconds
+    if state.duration_ms:
+        elapsed_ms = max(0, time.time() * 1000 - state.timestamp_ms)
+        remaining = (state.duration_ms - state.progress_ms - elapsed_ms) / 1000
+        if remaining < settings.playback_poll_interval_seconds:
+            return max(
+                settings.playback_poll_min_seconds,
+                remaining + settings.playback_poll_track_end_margin_seconds,
+            )
+    return settings.playback_poll_interval_seconds
+
+
+@dataclass(eq=False)
+class Subscription:
+    # None means every account
+    account_ids: frozenset[int] | None
+    queue: asyncio.Queue[dict] = field(default_factory=lambda: asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+
+    def wants(self, account_id: int) -> bool:
+        return self.account_ids is None or account_id in self.account_ids
+
+
+class PlaybackPoller:
+    """Background tasks polling viewed accounts, fanning state changes out to stream subscribers.
+
+    An account is polled only while at least one subscription covers it, at the
+    cadence given by ``next_poll_delay``, and only by the worker that has
+    claimed it; the others receive its states through the coordinator.
+    Subscribers receive events of the form ``{"account_id": 1, "state": {...}}``
+    where ``state`` holds only the fields that changed since the previous event
+    (the first event per account carries the full state). Failures are sent as
+    ``{"account_id": 1, "error": "..."}`` and removed accounts as
+    ``{"account_id": 1, "removed": true}``.
+
+    With ``history_sweep_unviewed`` set, the leader worker also fetches every
+    account nobody polls every ``history_sweep_interval_seconds``, so
+    transitions of accounts no one is watching still reach the history.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._wakeups: dict[int, asyncio.Event] = {}
+        self._states: dict[int, dict] = {}
+        self._errors: dict[int, str] = {}
+        self._subscriptions: set[Subscription] = set()
+        self._history_task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        # Every stored state is published, including optimistic updates after commands
+        state_cache.add_listener(self._publish_state)
+        settings = get_settings()
+        if settings.history_enabled and settings.history_sweep_unviewed and self._history_task is None:
+            self._history_task = asyncio.create_task(self._run_history_sweep())
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        if self._history_task is not None:
+            tasks.append(self._history_task)
+            self._history_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def watch(self, account_id: int) -> None:
+        """Start polling the account if anyone is viewing it."""
+        if account_id not in self._tasks and self._is_viewed(account_id):
+            self._wakeups[account_id] = asyncio.Event()
+            self._tasks[account_id] = asyncio.create_task(self._poll(account_id))
+
+    def unwatch(self, account_id: int) -> None:
+        self._stop_polling(account_id)
+        self._states.pop(account_id, None)
+        self._errors.pop(account_id, None)
+        state_cache.forget(account_id)
+        history_recorder.forget(account_id)
+        self._broadcast({"account_id": account_id, "removed": True})
+
+    def subscribe(self, account_ids: set[int] | None = None) -> Subscription:
+        subscription = Subscription(frozenset(account_ids) if account_ids is not None else None)
+        self._put_snapshot(subscription)
+        self._subscriptions.add(subscription)
+        for account in account_registry.all():
+            if subscription.wants(account.id):
+                self.watch(account.id)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        for account_id in list(self._tasks):
+            if not self._is_viewed(account_id):
+                self._stop_polling(account_id)
+
+    def _is_viewed(self, account_id: int) -> bool:
+        return any(subscription.wants(account_id) for subscription in self._subscriptions)
+
+    def _stop_polling(self, account_id: int) -> None:
+        task = self._tasks.pop(account_id, None)
+        self._wakeups.pop(account_id, None)
+        if task:
+            task.cancel()
+        coordinator.release(account_id)
+
+    async def _poll(self, account_id: int) -> None:
+        wakeup = self._wakeups[account_id]
+        while True:
+            try:
+                account = account_registry.get(account_id)
+                if account is None:
+                    self.unwatch(account_id)
+                    return
+                if await coordinator.claim(account_id):
+                    state = await state_cache.get_or_fetch(
+                        account_id, lambda: spotify.get_playback_state(account)
+                    )
+                else:
+                    # Another worker polls this account; its states arrive through the cache
+                    state = state_cache.peek(account_id)
+            except Exception as exc:
+                logger.warning("Polling account %s failed: %s", account_id, exc)
+                self._publish_error(account_id, str(exc) or type(exc).__name__)
+                state = None
+            wakeup.clear()
+            try:
+                # Commands and other viewers' fetches can change the cadence early
+                await asyncio.wait_for(wakeup.wait(), timeout=next_poll_delay(state))
+                await asyncio.sleep(get_settings().playback_poll_min_seconds)
+            except TimeoutError:
+                pass
+
+    async def _run_history_sweep(self) -> None:
+        interval = get_settings().history_sweep_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await coordinator.is_leader():
+                    await self.sweep_unviewed()
+            except Exception:
+                logger.exception("History sweep failed")
+
+    async def sweep_unviewed(self) -> None:
+        """Fetch each account no worker is polling, once, for the playback history."""
+        semaphore = asyncio.Semaphore(get_settings().playback_batch_concurrency)
+
+        async def sweep(account: Account) -> None:
+            async with semaphore:
+                # Polled accounts are recorded by whichever worker polls them
+                if account.id in self._tasks or not await coordinator.claim(account.id):
+                    return
+                try:
+                    await state_cache.get_or_fetch(account.id, lambda: spotify.get_playback_state(account))
+                except Exception as exc:
+                    logger.warning("History fetch for account %s failed: %s", account.id, exc)
+                finally:
+                    if account.id not in self._tasks:
+                        coordinator.release(account.id)
+
+        await asyncio.gather(*(sweep(account) for account in account_registry.all()))
+
+    def _publish_state(self, account_id: int, state: PlaybackState) -> None:
+        new = state.model_dump()
+        old = self._states.get(account_id)
+        self._states[account_id] = new
+        had_error = self._errors.pop(account_id, None) is not None
+        if old is None:
+            changes = new
+        else:
+            changes = {key: value for key, value in new.items() if old.get(key) != value}
+        if changes.keys() & CADENCE_FIELDS and account_id in self._wakeups:
+            self._wakeups[account_id].set()
+        # A fresh timestamp alone isn't news; it rides along with the next real change
+        if changes.keys() - {"timestamp_ms"} or had_error:
+            self._broadcast({"account_id": account_id, "state": changes, "error": None})
+        coordinator.share(account_id, state, next_poll_delay(state))
+
+    def _publish_error(self, account_id: int, error: str) -> None:
+        if self._errors.get(account_id) != error:
+            self._errors[account_id] = error
+            self._broadcast({"account_id": account_id, "error": error})
+
+    def _broadcast(self, event: dict) -> None:
+        for subscription in list(self._subscriptions):
+            if not subscription.wants(event["account_id"]):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client skips the backlog and catches up from a fresh snapshot
+                self._put_snapshot(subscription)
+
+    def _put_snapshot(self, subscription: Subscription) -> None:
+        queue = subscription.queue
+        while not queue.empty():
+            queue.get_nowait()
+        for account_id, state in self._states.items():
+            if subscription.wants(account_id):
+                queue.put_nowait({"account_id": account_id, "state": state})
+        for account_id, error in self._errors.items():
+            if subscription.wants(account_id):
+                queue.put_nowait({"account_id": account_id, "error": error})
+
+
+poller = PlaybackPoller()
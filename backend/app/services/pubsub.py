@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 5.0
+
+Handler = Callable[[str], Awaitable[None]]
+
+
+def _is_postgres(url: str) -> bool:
+    return make_url(url).get_backend_name() == "postgresql"
+
+
+async def notify(db: AsyncSession, channel: str, payload: str) -> None:
+    """Queue a NOTIFY in the session's transaction; it's delivered on commit."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_notify(channel, payload)))
+
+
+class PgListener:
+    """A dedicated asyncpg connection that LISTENs on channels for other instances' writes.
+
+    Handlers registered with ``on_reconnect`` run after every (re)connect, since
+    notifications sent while disconnected are lost and caches must resync.
+    ``on_disconnect`` callbacks run as soon as the connection drops, e.g. to give
+    up session-level advisory locks, which Postgres has released by then.
+    """
+
+    def __init__(self) -> None:
+        self._conn: asyncpg.Connection | None = None
+        self._handlers: dict[str, list[Handler]] = {}
+        self._reconnect_handlers: list[Callable[[], Awaitable[None]]] = []
+        self._disconnect_handlers: list[Callable[[], None]] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._query_lock = asyncio.Lock()
+        self._stopping = False
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def on(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], Awaitable[None]]) -> None:
+        self._reconnect_handlers.append(handler)
+
+    def on_disconnect(self, handler: Callable[[], None]) -> None:
+        self._disconnect_handlers.append(handler)
+
+    async def fetchval(self, query: str, *args: object) -> object:
+        """Run a query on the LISTEN connection (for session-scoped state like advisory locks)."""
+        if not self.connected:
+            raise ConnectionError("LISTEN connection is not open")
+        # asyncpg runs one query at a time per connection
+        async with self._query_lock:
+            return await self._conn.fetchval(query, *args)
+
+    async def start(self) -> None:
+        database_url = get_settings().database_url
+        if not _is_postgres(database_url):
+            return
+        self._stopping = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+        for handler in self._disconnect_handlers:
+            handler()
+
+    async def _connect(self) -> None:
+        dsn = make_url(get_settings().database_url).set(drivername="postgresql")
+        self._conn = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+        self._conn.add_termination_listener(self._on_terminated)
+        for channel in self._handlers:
+            await self._conn.add_listener(channel, self._on_notification)
+
+    def _on_notification(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, []):
+            self._spawn(handler(payload))
+
+    def _on_terminated(self, conn: asyncpg.Connection) -> None:
+        for handler in self._disconnect_handlers:
+            handler()
+        if not self._stopping:
+            logger.warning("LISTEN connection lost — reconnecting")
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._connect()
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("LISTEN reconnect failed: %s", exc)
+                continue
+            for handler in self._reconnect_handlers:
+                await handler()
+            return
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task[None]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("LISTEN handler failed", exc_info=task.exception())
+
+
+listener = PgListener()
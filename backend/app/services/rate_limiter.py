@@ -0,0 +1,152 @@
+import asyncio
+import time
+from enum import IntEnum
+
+from app.config import get_settings
+
+# Adaptive backoff: halve the refill rate on every 429, win it back a little per success
+MIN_RATE_FACTOR = 0.1
+RATE_FACTOR_DECREASE = 0.5
+RATE_FACTOR_INCREASE = 0.02
+
+
+class Priority(IntEnum):
+    COMMAND = 0
+    POLL = 1
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Spotify rate limit reached, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float, factor: float) -> None:
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate * factor)
+        self._updated = now
+
+    def wait_time(self, needed: float, factor: float) -> float:
+        """Seconds until the bucket holds ``needed`` tokens."""
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / (self.rate * factor)
+
+
+class RateGovernor:
+    """Budgets every outbound Spotify call against app-wide and per-account token buckets.
+
+    Background polls may not dip into the reserved share of the app budget, so
+    user commands still go through when polling has used up the rest. A 429
+    blocks all calls until its Retry-After has passed and lowers the refill
+    rate, which then recovers additively as calls succeed.
+    """
+
+    def __init__(self) -> None:
+        self._app: TokenBucket | None = None
+        self._accounts: dict[int, TokenBucket] = {}
+        self._blocked_until = 0.0
+        self._rate_factor = 1.0
+        self._counts = {"granted": 0, "rejected": 0, "throttled": 0}
+
+    async def acquire(self, account_id: int | None, priority: Priority) -> None:
+        settings = get_settings()
+        max_wait = (
+            settings.spotify_command_max_wait_seconds
+            if priority is Priority.COMMAND
+            else settings.spotify_poll_max_wait_seconds
+        )
+        deadline = time.monotonic() + max_wait
+        app_bucket = self._app_bucket()
+        reserve = app_bucket.capacity * settings.spotify_poll_reserve_fraction if priority is Priority.POLL else 0.0
+
+        while True:
+            wait = self._take(account_id, reserve)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                self._counts["rejected"] += 1
+                raise RateLimited(wait)
+            await asyncio.sleep(wait)
+
+    def try_acquire(self, account_id: int | None) -> bool:
+        """Take budget only if it's free right now and outside the poll reserve (for optional calls)."""
+        reserve = self._app_bucket().capacity * get_settings().spotify_poll_reserve_fraction
+        return self._take(account_id, reserve) <= 0
+
+    def _take(self, account_id: int | None, reserve: float) -> float:
+        """Take one token from each bucket if available (returns 0), else the seconds to wait."""
+        now = time.monotonic()
+        app_bucket = self._app_bucket()
+        app_bucket.refill(now, self._rate_factor)
+        account_bucket = self._account_bucket(account_id) if account_id is not None else None
+        if account_bucket is not None:
+            account_bucket.refill(now, self._rate_factor)
+
+        wait = max(
+            self._blocked_until - now,
+            app_bucket.wait_time(reserve + 1, self._rate_factor),
+            account_bucket.wait_time(1, self._rate_factor) if account_bucket else 0.0,
+        )
+        if wait <= 0:
+            app_bucket.tokens -= 1
+            if account_bucket is not None:
+                account_bucket.tokens -= 1
+            self._counts["granted"] += 1
+        return wait
+
+    def record_response(self, status_code: int, retry_after: str | None) -> float | None:
+        """Feed back an upstream response; returns the Retry-After delay for a 429."""
+        if status_code != 429:
+            self._rate_factor = min(1.0, self._rate_factor + RATE_FACTOR_INCREASE)
+            return None
+        try:
+            delay = float(retry_after) if retry_after else get_settings().spotify_default_retry_after_seconds
+        except ValueError:
+            delay = get_settings().spotify_default_retry_after_seconds
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        self._rate_factor = max(MIN_RATE_FACTOR, self._rate_factor * RATE_FACTOR_DECREASE)
+        self._counts["throttled"] += 1
+        return delay
+
+    def usage(self) -> dict:
+        now = time.monotonic()
+        app_bucket = self._app_bucket()
+        app_bucket.refill(now, self._rate_factor)
+        accounts = {}
+        for account_id, bucket in self._accounts.items():
+            bucket.refill(now, self._rate_factor)
+            accounts[account_id] = {"available": round(bucket.tokens, 2), "capacity": bucket.capacity}
+        return {
+            "available": round(app_bucket.tokens, 2),
+            "capacity": app_bucket.capacity,
+            "rate_per_second": round(app_bucket.rate * self._rate_factor, 2),
+            "rate_factor": round(self._rate_factor, 2),
+            "blocked_for_seconds": round(max(0.0, self._blocked_until - now), 2),
+            "counts": dict(self._counts),
+            "accounts": accounts,
+        }
+
+    def _app_bucket(self) -> TokenBucket:
+        if self._app is None:
+            settings = get_settings()
+            self._app = TokenBucket(settings.spotify_rate_per_second, settings.spotify_rate_burst)
+        return self._app
+
+    def _account_bucket(self, account_id: int) -> TokenBucket:
+        bucket = self._accounts.get(account_id)
+        if bucket is None:
+            settings = get_settings()
+            bucket = TokenBucket(settings.spotify_account_rate_per_second, settings.spotify_account_rate_burst)
+            self._accounts[account_id] = bucket
+        return bucket
+
+
+rate_governor = RateGovernor()
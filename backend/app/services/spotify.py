@@ -1,25 +1,166 @@
+import asyncio
+import logging
+import time
 from datetime import datetime, timedelta, timezone
 
 import httpx
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.database import async_session
+from app.metrics import (
+    HEDGED_REQUESTS,
+    NO_ACTIVE_DEVICE,
+    RATE_LIMITED,
+    TOKEN_REFRESHES,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_LATENCY,
+)
 from app.models import Account, PlaybackState
 from app.services import account_manager
+from app.services.account_registry import account_registry
+from app.services.circuit_breaker import CircuitOpen, circuit_breakers
+from app.services.coordination import coordinator, lock_token_refresh
+from app.services.history import history_recorder
+from app.services.http_client import get_client
+from app.services.rate_limiter import Priority, RateLimited, rate_governor
+from app.services.state_cache import state_cache
+from app.services.track_cache import track_cache
 
-SPOTIFY_API = "https://api.spotify.com/v1/me/player"
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional speed-up for parsing /me/player on every poll
+    from json import loads as json_loads
 
+logger = logging.getLogger(__name__)
 
-async def _ensure_token(db: AsyncSession, account: Account) -> str:
+MAX_RATE_LIMIT_RETRIES = 3
+
+_token_refreshes: dict[int, asyncio.Task[str]] = {}
+_reconciles: dict[int, asyncio.Task[None]] = {}
+
+
+def _headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _request(
+    method: str,
+    url: str,
+    *,
+    account_id: int | None = None,
+    priority: Priority = Priority.POLL,
+    **kwargs: object,
+) -> httpx.Response:
+    """Send a request over the shared, pooled client, within the rate budget.
+
+    A 429 is retried once its Retry-After has passed, as long as that fits in
+    the caller's wait budget; otherwise RateLimited is raised. Calls to an
+    endpoint whose circuit is open raise CircuitOpen without being sent.
+    """
+    endpoint = f"{method} {httpx.URL(url).path}"
+    breaker = circuit_breakers.get(endpoint)
+    for _ in range(MAX_RATE_LIMIT_RETRIES):
+        probe = breaker.before_call()
+        try:
+            await rate_governor.acquire(account_id, priority)
+        except (RateLimited, asyncio.CancelledError):
+            # Not sent, so no outcome to record; another call may probe instead
+            if probe:
+                breaker.cancel_probe()
+            raise
+        start = time.perf_counter()
+        status = "error"
+        UPSTREAM_IN_FLIGHT.inc()
+        try:
+            resp = await _send(method, url, account_id, kwargs)
+            status = str(resp.status_code)
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+            UPSTREAM_LATENCY.labels(endpoint, status).observe(time.perf_counter() - start)
+        if resp.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        retry_after = rate_governor.record_response(resp.status_code, resp.headers.get("Retry-After"))
+        if retry_after is None:
+            return resp
+        RATE_LIMITED.inc()
+    raise RateLimited(retry_after)
+
+
+async def _send(method: str, url: str, account_id: int | None, kwargs: dict) -> httpx.Response:
+    """Send the request; a slow GET gets a duplicate after ``spotify_hedge_after_ms``, first answer wins."""
+    client = get_client()
+    hedge_after = get_settings().spotify_hedge_after_ms / 1000
+    if method != "GET" or hedge_after <= 0:
+        return await client.request(method, url, **kwargs)
+
+    first = asyncio.create_task(client.request(method, url, **kwargs))
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        # The hedge only uses budget that's free right now, never the commands' reserve
+        if done or not rate_governor.try_acquire(account_id):
+            return await first
+        HEDGED_REQUESTS.inc()
+        pending.add(asyncio.create_task(client.request(method, url, **kwargs)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return first.result()  # both failed: raise the original error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _ensure_token(account: Account) -> str:
     """Return a valid access token, refreshing if expired."""
     if account.token_expires_at > datetime.now(timezone.utc):
         return account.access_token
+    return await refresh_token(account.id)
 
-    settings = get_settings()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            SPOTIFY_TOKEN_URL,
+
+async def refresh_token(account_id: int, valid_until: datetime | None = None) -> str:
+    """Refresh an account's access token, sharing one in-flight refresh per account.
+
+    The stored token is reused instead if it's already valid past ``valid_until``
+    (default: now), e.g. because a concurrent caller or the scheduler got there first.
+    """
+    task = _token_refreshes.get(account_id)
+    if task is None:
+        valid_until = valid_until or datetime.now(timezone.utc)
+        task = asyncio.create_task(_refresh_token(account_id, valid_until))
+        _token_refreshes[account_id] = task
+        task.add_done_callback(lambda _: _token_refreshes.pop(account_id, None))
+    return await asyncio.shield(task)
+
+
+async def _refresh_token(account_id: int, valid_until: datetime) -> str:
+    cached = account_registry.get(account_id)
+    if cached is not None and cached.token_expires_at > valid_until:
+        return cached.access_token
+
+    # Runs in its own session so it outlives whichever request triggered it
+    async with async_session() as db:
+        # Another worker refreshing this account finishes first; we then see its new token
+        await lock_token_refresh(db, account_id)
+        account = await account_manager.get_account(db, account_id)
+        if account is None:
+            raise LookupError(f"Account {account_id} not found")
+        if account.token_expires_at > valid_until:
+            return account.access_token
+
+        settings = get_settings()
+        resp = await _request(
+            "POST",
+            settings.spotify_token_url,
+            account_id=account_id,
+            priority=Priority.COMMAND,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": account.refresh_token,
@@ -27,81 +168,158 @@ async def _ensure_token(db: AsyncSession, account: Account) -> str:
                 "client_secret": settings.spotify_client_secret,
             },
         )
+        if resp.is_error:
+            TOKEN_REFRESHES.labels("failure").inc()
         resp.raise_for_status()
+        TOKEN_REFRESHES.labels("success").inc()
         data = resp.json()
 
-    new_expires = datetime.now(timezone.utc) + timedelta(seconds=data["expires_in"])
-    await account_manager.update_tokens(
-        db,
-        account,
-        access_token=data["access_token"],
-        token_expires_at=new_expires,
-        refresh_token=data.get("refresh_token"),
-    )
+        new_expires = datetime.now(timezone.utc) + timedelta(seconds=data["expires_in"])
+        await account_manager.update_tokens(
+            db,
+            account,
+            access_token=data["access_token"],
+            token_expires_at=new_expires,
+            refresh_token=data.get("refresh_token"),
+        )
     return data["access_token"]
 
 
-def _headers(token: str) -> dict[str, str]:
-    return {"Authorization": f"Bearer {token}"}
-
+async def get_playback_state(account: Account) -> PlaybackState:
+    """Current state from Spotify, or the last known one marked ``stale`` while its circuit is open."""
+    settings = get_settings()
+    timeout = httpx.Timeout(
+        settings.spotify_state_read_timeout,
+        connect=settings.spotify_connect_timeout,
+        pool=settings.spotify_pool_timeout,
+    )
+    try:
+        token = await _ensure_token(account)
+        resp = await _request(
+            "GET", settings.spotify_player_url, account_id=account.id, headers=_headers(token), timeout=timeout
+        )
+    except CircuitOpen:
+        known = state_cache.peek(account.id)
+        if known is None:
+            raise
+        return known if known.stale else known.model_copy(update={"stale": True})
+    state = _parse_player(resp)
+    # With several workers, the one polling the account records its history
+    if coordinator.owns(account.id):
+        history_recorder.observe(account.id, state)
+    return state
 
-async def get_playback_state(db: AsyncSession, account: Account) -> PlaybackState:
-    token = await _ensure_token(db, account)
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(SPOTIFY_API, headers=_headers(token))
 
+def _parse_player(resp: httpx.Response) -> PlaybackState:
     if resp.status_code == 204 or resp.status_code == 202:
         return PlaybackState(is_playing=False)
 
     resp.raise_for_status()
-    data = resp.json()
+    data = json_loads(resp.content)
 
-    track = data.get("item")
-    images = track.get("album", {}).get("images", []) if track else []
+    item = data.get("item")
+    device = data.get("device") or {}
+    if not item:
+        return PlaybackState(
+            is_playing=data.get("is_playing", False),
+            progress_ms=data.get("progress_ms", 0),
+            volume_percent=device.get("volume_percent"),
+            device_name=device.get("name"),
+        )
 
+    track = track_cache.from_item(item)
     return PlaybackState(
         is_playing=data.get("is_playing", False),
-        track_name=track.get("name") if track else None,
-        artist_name=", ".join(a["name"] for a in track.get("artists", [])) if track else None,
-        album_name=track.get("album", {}).get("name") if track else None,
-        album_image_url=images[0]["url"] if images else None,
+        track_id=track.track_id,
+        track_name=track.track_name,
+        artist_name=track.artist_name,
+        album_name=track.album_name,
+        album_image_url=track.album_image_url,
         progress_ms=data.get("progress_ms", 0),
-        duration_ms=track.get("duration_ms", 0) if track else 0,
-        volume_percent=data.get("device", {}).get("volume_percent"),
-        device_name=data.get("device", {}).get("name"),
+        duration_ms=track.duration_ms,
+        volume_percent=device.get("volume_percent"),
+        device_name=device.get("name"),
     )
 
 
 async def _spotify_command(
-    db: AsyncSession, account: Account, method: str, path: str, **kwargs: object
-) -> None:
-    """Send a command to the Spotify API. 204/202/403 are treated as success."""
-    token = await _ensure_token(db, account)
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(method, f"{SPOTIFY_API}{path}", headers=_headers(token), **kwargs)
-        if resp.status_code not in (204, 202, 403):
-            resp.raise_for_status()
+    account: Account, method: str, path: str, **kwargs: object
+) -> bool:
+    """Send a command to the Spotify API. 204/202/403 are treated as success.
+
+    Returns False for 403, which Spotify sends when there's no active device.
+    """
+    token = await _ensure_token(account)
+    resp = await _request(
+        method,
+        f"{get_settings().spotify_player_url}{path}",
+        account_id=account.id,
+        priority=Priority.COMMAND,
+        headers=_headers(token),
+        **kwargs,
+    )
+    if resp.status_code not in (204, 202, 403):
+        resp.raise_for_status()
+    if resp.status_code == 403:
+        NO_ACTIVE_DEVICE.inc()
+        return False
+    return True
+
+
+def _predict(account: Account, applied: bool, **changes: object) -> None:
+    """Apply a command's expected effect to the cached state, then verify it shortly after.
+
+    Without ``changes`` (e.g. skipping tracks) the outcome can't be predicted,
+    so the cached state is only invalidated.
+    """
+    if not applied:
+        return
+    if changes:
+        state_cache.update(account.id, **changes)
+    else:
+        state_cache.invalidate(account.id)
+
+    pending = _reconciles.pop(account.id, None)
+    if pending:
+        pending.cancel()
+    _reconciles[account.id] = asyncio.create_task(_reconcile(account))
+
+
+async def _reconcile(account: Account) -> None:
+    await asyncio.sleep(get_settings().command_reconcile_delay_ms / 1000)
+    _reconciles.pop(account.id, None)
+    state_cache.invalidate(account.id)
+    try:
+        await state_cache.get_or_fetch(account.id, lambda: get_playback_state(account))
+    except Exception as exc:
+        logger.warning("Reconciling state for account %s failed: %s", account.id, exc)
 
 
-async def play(db: AsyncSession, account: Account) -> None:
-    await _spotify_command(db, account, "PUT", "/play")
+async def play(account: Account) -> None:
+    applied = await _spotify_command(account, "PUT", "/play")
+    _predict(account, applied, is_playing=True)
 
 
-async def pause(db: AsyncSession, account: Account) -> None:
-    await _spotify_command(db, account, "PUT", "/pause")
+async def pause(account: Account) -> None:
+    applied = await _spotify_command(account, "PUT", "/pause")
+    _predict(account, applied, is_playing=False)
 
 
-async def set_volume(db: AsyncSession, account: Account, volume_percent: int) -> None:
-    await _spotify_command(db, account, "PUT", "/volume", params={"volume_percent": volume_percent})
+async def set_volume(account: Account, volume_percent: int) -> None:
+    applied = await _spotify_command(account, "PUT", "/volume", params={"volume_percent": volume_percent})
+    _predict(account, applied, volume_percent=volume_percent)
 
 
-async def seek(db: AsyncSession, account: Account, position_ms: int) -> None:
-    await _spotify_command(db, account, "PUT", "/seek", params={"position_ms": position_ms})
+async def seek(account: Account, position_ms: int) -> None:
+    applied = await _spotify_command(account, "PUT", "/seek", params={"position_ms": position_ms})
+    _predict(account, applied, progress_ms=position_ms, timestamp_ms=int(time.time() * 1000))
 
 
-async def next_track(db: AsyncSession, account: Account) -> None:
-    await _spotify_command(db, account, "POST", "/next")
+async def next_track(account: Account) -> None:
+    applied = await _spotify_command(account, "POST", "/next")
+    _predict(account, applied)
 
 
-async def previous_track(db: AsyncSession, account: Account) -> None:
-    await _spotify_command(db, account, "POST", "/previous")
+async def previous_track(account: Account) -> None:
+    applied = await _spotify_command(account, "POST", "/previous")
+    _predict(account, applied)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from app.config import get_settings
+from app.models import PlaybackState
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[int, PlaybackState], None]
+
+
+class PlaybackStateCache:
+    """Per-account playback state cache with a short TTL.
+
+    Concurrent misses for the same account share a single upstream fetch.
+    Every invalidation or in-place update bumps the account's generation so a
+    fetch that started before a command can't overwrite the newer entry.
+    Expired entries are kept as the last known state for ``peek`` and for
+    patching by optimistic updates. Listeners hear about every stored state.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[float, PlaybackState]] = {}
+        self._inflight: dict[int, asyncio.Task[PlaybackState]] = {}
+        self._generations: dict[int, int] = {}
+        self._listeners: list[Listener] = []
+
+    def add_listener(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def get(self, account_id: int) -> PlaybackState | None:
+        """The cached state if it's still within its TTL."""
+        entry = self._entries.get(account_id)
+        if entry and time.monotonic() < entry[0]:
+            return entry[1]
+        return None
+
+    def peek(self, account_id: int) -> PlaybackState | None:
+        """The last known state, however old."""
+        entry = self._entries.get(account_id)
+        return entry[1] if entry else None
+
+    async def get_or_fetch(
+        self, account_id: int, fetch: Callable[[], Awaitable[PlaybackState]]
+    ) -> PlaybackState:
+        cached = self.get(account_id)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(account_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(account_id, fetch))
+            self._inflight[account_id] = task
+        # Shield so one disconnecting viewer doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def set(self, account_id: int, state: PlaybackState, ttl: float | None = None) -> None:
+        self._bump(account_id)
+        self._store(account_id, state, ttl)
+
+    def update(self, account_id: int, **changes: object) -> PlaybackState | None:
+        """Patch the last known state, or drop it if nothing is known yet."""
+        known = self.peek(account_id)
+        if known is None:
+            self.invalidate(account_id)
+            return None
+        state = known.model_copy(update=changes)
+        self.set(account_id, state)
+        return state
+
+    def invalidate(self, account_id: int) -> None:
+        self._bump(account_id)
+        entry = self._entries.get(account_id)
+        if entry:
+            self._entries[account_id] = (0.0, entry[1])
+
+    def forget(self, account_id: int) -> None:
+        self._bump(account_id)
+        self._entries.pop(account_id, None)
+
+    async def _fetch(
+        self, account_id: int, fetch: Callable[[], Awaitable[PlaybackState]]
+    ) -> PlaybackState:
+        generation = self._generations.get(account_id, 0)
+        try:
+            state = await fetch()
+            if self._generations.get(account_id, 0) == generation:
+                self._store(account_id, state)
+            return state
+        finally:
+            if self._inflight.get(account_id) is asyncio.current_task():
+                del self._inflight[account_id]
+
+    def _store(self, account_id: int, state: PlaybackState, ttl: float | None = None) -> None:
+        if ttl is None:
+            ttl = get_settings().playback_state_ttl_seconds
+        self._entries[account_id] = (time.monotonic() + ttl, state)
+        for listener in self._listeners:
+            try:
+                listener(account_id, state)
+            except Exception:
+                logger.exception("Playback state listener failed")
+
+    def _bump(self, account_id: int) -> None:
+        self._generations[account_id] = self._generations.get(account_id, 0) + 1
+        # Callers arriving after a command must not join a fetch that started before it
+        self._inflight.pop(account_id, None)
+
+
+state_cache = PlaybackStateCache()
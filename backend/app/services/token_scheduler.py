@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.config import get_settings
+from app.models import Account
+from app.services import spotify
+from app.services.account_registry import account_registry
+from app.services.coordination import coordinator
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRefreshScheduler:
+    """Refreshes access tokens ahead of expiry so requests never wait on one.
+
+    Each account gets a random jitter per token lifetime, so accounts linked at
+    the same time don't all hit the token endpoint in the same instant.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[None] | None = None
+        self._jitter: dict[int, tuple[datetime, float]] = {}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        interval = get_settings().token_refresh_check_interval_seconds
+        while True:
+            try:
+                if await coordinator.is_leader():
+                    await self.refresh_due()
+            except Exception:
+                logger.exception("Token refresh sweep failed")
+            await asyncio.sleep(interval)
+
+    async def refresh_due(self) -> None:
+        settings = get_settings()
+        margin = timedelta(seconds=settings.token_refresh_margin_seconds)
+        now = datetime.now(timezone.utc)
+
+        accounts = account_registry.all()
+        live_ids = {account.id for account in accounts}
+        self._jitter = {k: v for k, v in self._jitter.items() if k in live_ids}
+
+        # The threshold that makes an account due is also what its refresh must get past,
+        # otherwise the refresh would find the stored token still good enough and keep it
+        due: dict[int, datetime] = {}
+        for account in accounts:
+            valid_until = now + margin + self._jitter_for(account)
+            if account.token_expires_at <= valid_until:
+                due[account.id] = valid_until
+        if not due:
+            return
+        results = await asyncio.gather(
+            *(spotify.refresh_token(account_id, valid_until=valid_until) for account_id, valid_until in due.items()),
+            return_exceptions=True,
+        )
+        for account_id, result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.warning("Proactive token refresh for account %s failed: %s", account_id, result)
+
+    def _jitter_for(self, account: Account) -> timedelta:
+        # Drawn once per token lifetime so the schedule doesn't shift between sweeps
+        cached = self._jitter.get(account.id)
+        if cached is None or cached[0] != account.token_expires_at:
+            jitter = random.uniform(0, get_settings().token_refresh_jitter_seconds)
+            cached = (account.token_expires_at, jitter)
+            self._jitter[account.id] = cached
+        return timedelta(seconds=cached[1])
+
+
+token_scheduler = TokenRefreshScheduler()
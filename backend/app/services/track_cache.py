@@ -0,0 +1,81 @@
+"""Track metadata by Spotify track id, so repeat polls of the same track skip rebuilding it.
+
+While a track plays, every poll returns the same item; only progress and
+device fields change. The cache keeps the derived strings (artist list,
+cover URL) per track, and lets compact state responses carry just the id.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import get_settings
+from app.models import PlaybackState
+from app.services.media_cache import choose_cover, cover_url
+
+
+@dataclass(frozen=True, slots=True)
+class TrackMetadata:
+    track_id: str | None
+    track_name: str | None
+    artist_name: str | None
+    album_name: str | None
+    album_image_url: str | None
+    duration_ms: int
+
+
+def _build(item: dict) -> TrackMetadata:
+    album = item.get("album") or {}
+    return TrackMetadata(
+        track_id=item.get("id"),
+        track_name=item.get("name"),
+        artist_name=", ".join(a["name"] for a in item.get("artists", [])),
+        album_name=album.get("name"),
+        album_image_url=cover_url(choose_cover(album.get("images", []))),
+        duration_ms=item.get("duration_ms", 0),
+    )
+
+
+class TrackCache:
+    """Bounded LRU of track metadata."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._tracks: OrderedDict[str, TrackMetadata] = OrderedDict()
+
+    def get(self, track_id: str) -> TrackMetadata | None:
+        track = self._tracks.get(track_id)
+        if track is not None:
+            self._tracks.move_to_end(track_id)
+        return track
+
+    def from_item(self, item: dict) -> TrackMetadata:
+        """Metadata for a /me/player ``item``, built only the first time its id is seen."""
+        track_id = item.get("id")
+        if track_id is None:  # local files have no id
+            return _build(item)
+        track = self.get(track_id)
+        if track is None:
+            track = _build(item)
+            self._put(track_id, track)
+        return track
+
+    def from_state(self, state: PlaybackState) -> None:
+        """Remember the track of a state built elsewhere (e.g. received from another worker)."""
+        if state.track_id is None or self.get(state.track_id) is not None:
+            return
+        self._put(state.track_id, TrackMetadata(
+            track_id=state.track_id,
+            track_name=state.track_name,
+            artist_name=state.artist_name,
+            album_name=state.album_name,
+            album_image_url=state.album_image_url,
+            duration_ms=state.duration_ms,
+        ))
+
+    def _put(self, track_id: str, track: TrackMetadata) -> None:
+        self._tracks[track_id] = track
+        if len(self._tracks) > self.max_size:
+            self._tracks.popitem(last=False)
+
+
+track_cache = TrackCache(get_settings().track_cache_size)
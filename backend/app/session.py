@@ -14,8 +14,12 @@ def create_session_token(email: str, secret: str) -> str:
 
 
 def verify_session_token(token: str, secret: str) -> str | None:
+    payload = decode_session_token(token, secret)
+    return payload.get("email") if payload else None
+
+
+def decode_session_token(token: str, secret: str) -> dict | None:
     try:
-        payload = jwt.decode(token, secret, algorithms=["HS256"])
-        return payload.get("email")
+        return jwt.decode(token, secret, algorithms=["HS256"])
     except jwt.PyJWTError:
         return None
@@ -0,0 +1,108 @@
+"""Per-request overhead of the auth middleware.
+
+Compares the previous BaseHTTPMiddleware implementation (full JWT decode on
+every request) with the pure ASGI AuthMiddleware and its verified-session
+cache, by driving a bare ASGI endpoint directly — no sockets, no HTTP client.
+
+    cd backend && python -m benchmarks.auth_middleware [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+for _name in ("SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark-secret-benchmark-secret")
+
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.middleware import auth  # noqa: E402
+from app.session import create_session_token, verify_session_token  # noqa: E402
+
+EMAIL = "bench@example.com"
+ALLOWED = frozenset({EMAIL})
+
+
+class BaselineAuthMiddleware(BaseHTTPMiddleware):
+    """The implementation AuthMiddleware replaced, kept here for comparison."""
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if path in auth.PUBLIC_PATHS:
+            return await call_next(request)
+        session_token = request.cookies.get("session")
+        if session_token:
+            email = verify_session_token(session_token, get_settings().session_secret)
+            if email and email.lower() in ALLOWED:
+                request.state.user_email = email
+                return await call_next(request)
+        if path.startswith(auth.API_PREFIXES):
+            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+        return RedirectResponse("/google/login")
+
+
+async def endpoint(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+async def drive(app, requests: int, cookie: bytes) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/playback/1/state",
+        "raw_path": b"/playback/1/state",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - start
+
+
+async def main(requests: int) -> None:
+    auth.get_allowed_emails = lambda: ALLOWED
+    token = create_session_token(EMAIL, get_settings().session_secret)
+    cookie = f"session={token}".encode()
+
+    candidates = {
+        "no middleware": endpoint,
+        "BaseHTTPMiddleware (baseline)": BaselineAuthMiddleware(endpoint),
+        "pure ASGI, cache disabled": auth.AuthMiddleware(endpoint),
+        "pure ASGI + session cache": auth.AuthMiddleware(endpoint),
+    }
+    candidates["pure ASGI, cache disabled"].sessions.maxsize = 0
+
+    results = {}
+    for name, app in candidates.items():
+        await drive(app, min(1000, requests), cookie)  # warm up
+        results[name] = await drive(app, requests, cookie) / requests * 1e6
+
+    floor = results["no middleware"]
+    print(f"{'variant':<32}{'µs/request':>12}{'overhead µs':>14}")
+    for name, per_request in results.items():
+        print(f"{name:<32}{per_request:>12.1f}{per_request - floor:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,204 @@
+"""A local stand-in for the Spotify Web API and accounts service.
+
+Simulates upstream latency, 429s with Retry-After, short-lived access tokens
+(401 once expired) and accounts with no active device (204 on state, 403 on
+commands). Use it in-process through ``httpx.ASGITransport(create_app(...))``
+or run it standalone and point the panel at it:
+
+    cd backend && python -m benchmarks.fake_spotify --port 9000
+    SPOTIFY_API_BASE_URL=http://127.0.0.1:9000/v1 \\
+    SPOTIFY_ACCOUNTS_BASE_URL=http://127.0.0.1:9000 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Header, Query, Request, Response
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeSpotifyConfig:
+    latency_ms: float = 40.0
+    latency_jitter_ms: float = 20.0
+    rate_limit_probability: float = 0.0
+    retry_after_seconds: int = 1
+    token_lifetime_seconds: int = 3600
+    no_device_probability: float = 0.1
+    seed: int | None = None
+
+
+@dataclass
+class _Player:
+    has_device: bool
+    is_playing: bool = True
+    track: int = 0
+    progress_ms: int = 0
+    duration_ms: int = 180_000
+    volume_percent: int = 50
+    updated: float = field(default_factory=time.monotonic)
+
+    def advance(self) -> None:
+        now = time.monotonic()
+        if self.is_playing:
+            self.progress_ms += int((now - self.updated) * 1000)
+            if self.progress_ms >= self.duration_ms:
+                self.track += 1
+                self.progress_ms %= self.duration_ms
+        self.updated = now
+
+
+class FakeSpotify:
+    def __init__(self, config: FakeSpotifyConfig):
+        self.config = config
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(config.seed)
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._players: dict[str, _Player] = {}
+
+    def issue_token(self, user: str) -> tuple[str, int]:
+        token = f"fake-{user}-{secrets.token_hex(8)}"
+        self._tokens[token] = (user, time.monotonic() + self.config.token_lifetime_seconds)
+        return token, self.config.token_lifetime_seconds
+
+    def player(self, user: str) -> _Player:
+        if user not in self._players:
+            has_device = self._random.random() >= self.config.no_device_probability
+            self._players[user] = _Player(has_device=has_device, track=self._random.randrange(1000))
+        return self._players[user]
+
+    async def simulate(self, name: str) -> Response | None:
+        """Count the call, sleep for the simulated latency and maybe answer 429."""
+        self.calls[name] += 1
+        delay = max(0.0, self._random.gauss(self.config.latency_ms, self.config.latency_jitter_ms))
+        await asyncio.sleep(delay / 1000)
+        if self._random.random() < self.config.rate_limit_probability:
+            self.calls["429"] += 1
+            return Response(status_code=429, headers={"Retry-After": str(self.config.retry_after_seconds)})
+        return None
+
+    def authenticate(self, authorization: str | None) -> str | None:
+        token = (authorization or "").removeprefix("Bearer ")
+        entry = self._tokens.get(token)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+
+def create_app(config: FakeSpotifyConfig | None = None) -> FastAPI:
+    fake = FakeSpotify(config or FakeSpotifyConfig())
+    app = FastAPI(title="Fake Spotify")
+    app.state.fake = fake
+
+    def unauthorized() -> JSONResponse:
+        fake.calls["401"] += 1
+        return JSONResponse(status_code=401, content={"error": {"status": 401, "message": "The access token expired"}})
+
+    @app.post("/api/token")
+    async def token(request: Request):
+        if limited := await fake.simulate("token"):
+            return limited
+        form = {key: values[0] for key, values in parse_qs((await request.body()).decode()).items()}
+        grant_type = form.get("grant_type")
+        user = (form.get("refresh_token") or form.get("code") or "user").removeprefix("refresh-")
+        access_token, expires_in = fake.issue_token(user)
+        body = {"access_token": access_token, "token_type": "Bearer", "expires_in": expires_in}
+        if grant_type == "authorization_code":
+            body["refresh_token"] = f"refresh-{user}"
+        return body
+
+    @app.get("/v1/me")
+    async def me(authorization: str | None = Header(None)):
+        if limited := await fake.simulate("me"):
+            return limited
+        user = fake.authenticate(authorization)
+        if user is None:
+            return unauthorized()
+        return {"id": user, "display_name": user.title()}
+
+    @app.get("/v1/me/player")
+    async def player_state(authorization: str | None = Header(None)):
+        if limited := await fake.simulate("state"):
+            return limited
+        user = fake.authenticate(authorization)
+        if user is None:
+            return unauthorized()
+        player = fake.player(user)
+        if not player.has_device:
+            return Response(status_code=204)
+        player.advance()
+        return {
+            "is_playing": player.is_playing,
+            "progress_ms": player.progress_ms,
+            "device": {"name": f"{user}'s speaker", "volume_percent": player.volume_percent},
+            "item": {
+                "id": f"track{player.track}",
+                "name": f"Track {player.track}",
+                "duration_ms": player.duration_ms,
+                "artists": [{"name": f"Artist {player.track % 97}"}],
+                "album": {
+                    "name": f"Album {player.track % 31}",
+                    "images": [{"url": f"https://i.scdn.co/image/fake{player.track % 31}", "width": 640}],
+                },
+            },
+        }
+
+    @app.api_route("/v1/me/player/{command}", methods=["PUT", "POST"])
+    async def player_command(
+        command: str,
+        authorization: str | None = Header(None),
+        volume_percent: int | None = Query(None),
+        position_ms: int | None = Query(None),
+    ):
+        if limited := await fake.simulate(command):
+            return limited
+        user = fake.authenticate(authorization)
+        if user is None:
+            return unauthorized()
+        player = fake.player(user)
+        if not player.has_device:
+            return JSONResponse(status_code=403, content={"error": {"status": 403, "reason": "NO_ACTIVE_DEVICE"}})
+        player.advance()
+        if command in ("play", "pause"):
+            player.is_playing = command == "play"
+        elif command == "volume" and volume_percent is not None:
+            player.volume_percent = volume_percent
+        elif command == "seek" and position_ms is not None:
+            player.progress_ms = position_ms
+        elif command in ("next", "previous"):
+            player.track += 1 if command == "next" else -1
+            player.progress_ms = 0
+        else:
+            return JSONResponse(status_code=404, content={"error": {"status": 404}})
+        return Response(status_code=204)
+
+    @app.get("/_stats")
+    async def stats():
+        return dict(fake.calls)
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the fake Spotify API")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--token-lifetime", type=int, default=3600)
+    parser.add_argument("--no-device-probability", type=float, default=0.1)
+    args = parser.parse_args()
+    config = FakeSpotifyConfig(
+        latency_ms=args.latency_ms,
+        rate_limit_probability=args.rate_limit_probability,
+        token_lifetime_seconds=args.token_lifetime,
+        no_device_probability=args.no_device_probability,
+    )
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port)
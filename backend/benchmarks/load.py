@@ -0,0 +1,238 @@
+"""Offline load test: the panel driven in-process against the fake Spotify server.
+
+For each (accounts, viewers) combination, seeds that many linked accounts into a
+scratch database, then runs concurrent simulated dashboard viewers for a fixed
+duration. Each viewer lists accounts once, then keeps fetching playback state
+(one request per account, or one batched request) and occasionally sends a
+command. Reports p50/p99 latency per route, throughput, and how many calls
+reached the fake Spotify upstream.
+
+    cd backend && python -m benchmarks.load --accounts 1,10,100,500 --viewers 1,10
+
+Each combination runs in its own subprocess so in-process caches start cold.
+The database's tables are dropped and recreated: the default is a temporary
+SQLite file (requires aiosqlite); only pass --database-url for a scratch DB.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+EMAIL = "bench@example.com"
+
+
+def _configure_env(args: argparse.Namespace) -> None:
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["SPOTIFY_API_BASE_URL"] = "http://fake-spotify/v1"
+    os.environ["SPOTIFY_ACCOUNTS_BASE_URL"] = "http://fake-spotify"
+    os.environ["SPOTIFY_HTTP2"] = "false"
+    if args.rate_per_second is not None:
+        os.environ["SPOTIFY_RATE_PER_SECOND"] = str(args.rate_per_second)
+        os.environ["SPOTIFY_RATE_BURST"] = str(int(args.rate_per_second * 2))
+    for name in ("SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ.setdefault("SESSION_SECRET", "benchmark-secret-benchmark-secret")
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(args: argparse.Namespace, accounts: int, viewers: int) -> dict:
+    # Imported here: settings and the DB engine are built from the environment at import time
+    import httpx
+    from sqlalchemy import event
+
+    from app.config import get_settings
+    from app.database import Base, async_session, engine
+    from app.main import app
+    from app.middleware import auth as auth_middleware
+    from app.models import Account
+    from app.services import http_client
+    from app.session import create_session_token
+    from benchmarks.fake_spotify import FakeSpotifyConfig, create_app
+
+    fake_app = create_app(
+        FakeSpotifyConfig(
+            latency_ms=args.latency_ms,
+            rate_limit_probability=args.rate_limit_probability,
+            token_lifetime_seconds=args.token_lifetime,
+            seed=1,
+        )
+    )
+    fake = fake_app.state.fake
+    if engine.dialect.name == "sqlite":
+        # SQLite drops tzinfo on DateTime(timezone=True); restore it as Postgres would
+        @event.listens_for(Account, "load")
+        def _restore_utc(account: Account, _context) -> None:
+            if account.token_expires_at.tzinfo is None:
+                account.token_expires_at = account.token_expires_at.replace(tzinfo=timezone.utc)
+
+    await http_client.use_transport(httpx.ASGITransport(app=fake_app))
+    auth_middleware.get_allowed_emails = lambda: frozenset({EMAIL})
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.now(timezone.utc)
+    async with async_session() as db:
+        for i in range(accounts):
+            user = f"user{i}"
+            access_token, _ = fake.issue_token(user)
+            # Some tokens start out expired or close to it, to exercise refreshes
+            expires = now + timedelta(seconds=random.uniform(-60, args.token_lifetime))
+            db.add(Account(
+                spotify_user_id=user,
+                display_name=user,
+                access_token=access_token,
+                refresh_token=f"refresh-{user}",
+                token_expires_at=expires,
+                sort_order=i,
+            ))
+        await db.commit()
+    fake.calls.clear()
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: Counter[str] = Counter()
+    cookie = create_session_token(EMAIL, get_settings().session_secret)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://panel", cookies={"session": cookie}
+        ) as client:
+
+            async def timed(route: str, method: str, url: str) -> httpx.Response:
+                start = time.perf_counter()
+                resp = await client.request(method, url)
+                latencies[route].append(time.perf_counter() - start)
+                statuses[f"{route} {resp.status_code}"] += 1
+                return resp
+
+            async def viewer() -> None:
+                ids = [a["id"] for a in (await timed("GET /auth/accounts", "GET", "/auth/accounts")).json()]
+                deadline = time.monotonic() + args.duration
+                while time.monotonic() < deadline:
+                    if args.mode == "batch":
+                        await timed("GET /playback/states", "GET", "/playback/states")
+                    else:
+                        await asyncio.gather(*(
+                            timed("GET /playback/{id}/state", "GET", f"/playback/{account_id}/state")
+                            for account_id in ids
+                        ))
+                    if ids and random.random() < args.command_probability:
+                        level = random.randint(0, 100)
+                        await timed(
+                            "PUT /playback/{id}/volume", "PUT", f"/playback/{random.choice(ids)}/volume?level={level}"
+                        )
+                    await asyncio.sleep(args.poll_interval)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(viewer() for _ in range(viewers)))
+            elapsed = time.perf_counter() - started
+
+    await engine.dispose()
+    return {
+        "accounts": accounts,
+        "viewers": viewers,
+        "elapsed_s": round(elapsed, 2),
+        "requests": sum(len(v) for v in latencies.values()),
+        "throughput_rps": round(sum(len(v) for v in latencies.values()) / elapsed, 1),
+        "routes": {
+            route: {
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+                "p99_ms": round(_percentile(values, 0.99) * 1000, 1),
+            }
+            for route, values in latencies.items()
+        },
+        "statuses": dict(statuses),
+        "upstream_calls": dict(fake.calls),
+    }
+
+
+def _print_report(results: list[dict]) -> None:
+    header = f"{'accounts':>8} {'viewers':>7} {'route':<28} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}"
+    for result in results:
+        upstream = sum(v for k, v in result["upstream_calls"].items() if not k.isdigit())
+        print(
+            f"\n{result['accounts']} account(s), {result['viewers']} viewer(s): "
+            f"{result['requests']} requests in {result['elapsed_s']}s "
+            f"({result['throughput_rps']} req/s), {upstream} upstream calls {result['upstream_calls']}"
+        )
+        print(header)
+        for route, stats in result["routes"].items():
+            print(
+                f"{result['accounts']:>8} {result['viewers']:>7} {route:<28} "
+                f"{stats['count']:>7} {stats['p50_ms']:>8} {stats['p99_ms']:>8}"
+            )
+        errors = {k: v for k, v in result["statuses"].items() if not k.endswith(("200", "304"))}
+        if errors:
+            print(f"  non-2xx: {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test against a fake Spotify")
+    parser.add_argument("--accounts", default="1,10,100", help="comma-separated account counts (1-500)")
+    parser.add_argument("--viewers", default="1,10", help="comma-separated concurrent viewer counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per combination")
+    parser.add_argument("--mode", choices=["state", "batch"], default="state")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--command-probability", type=float, default=0.05)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--token-lifetime", type=int, default=3600)
+    parser.add_argument(
+        "--rate-per-second", type=float, default=None, help="app-wide rate budget (default: the app setting)"
+    )
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        accounts, viewers = (int(n) for n in args.scenario.split(":"))
+        _configure_env(args)
+        print(json.dumps(asyncio.run(run_scenario(args, accounts, viewers))))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url is None:
+            args.database_url = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        # Everything but --database-url (and its value), which is passed resolved
+        passthrough = []
+        argv = iter(sys.argv[1:])
+        for arg in argv:
+            if arg == "--database-url":
+                next(argv, None)
+            elif not arg.startswith("--database-url="):
+                passthrough.append(arg)
+        for accounts in (int(n) for n in args.accounts.split(",")):
+            for viewers in (int(n) for n in args.viewers.split(",")):
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.load", *passthrough,
+                     "--database-url", args.database_url, "--scenario", f"{accounts}:{viewers}"],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_report(results)
+
+
+if __name__ == "__main__":
+    main()
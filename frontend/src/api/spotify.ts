@@ -6,6 +6,7 @@ export interface Account {
 
 export interface PlaybackState {
   is_playing: boolean;
+  track_id: string | null;
   track_name: string | null;
   artist_name: string | null;
   album_name: string | null;
@@ -14,6 +15,9 @@ export interface PlaybackState {
   duration_ms: number;
   volume_percent: number | null;
   device_name: string | null;
+  timestamp_ms: number;
+  // Last known state, served while Spotify isn't responding
+  stale: boolean;
 }
 
 const BASE = "";
@@ -51,8 +55,8 @@ export async function deleteAccount(accountId: number): Promise<void> {
   await api(`/auth/accounts/${accountId}`, { method: "DELETE" });
 }
 
-export async function reorderAccounts(orderedIds: number[]): Promise<void> {
-  await api("/auth/accounts/reorder", {
+export async function reorderAccounts(orderedIds: number[]): Promise<Account[]> {
+  return api("/auth/accounts/reorder", {
     method: "PUT",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(orderedIds),
@@ -65,6 +69,75 @@ export async function getPlaybackState(
   return api(`/playback/${accountId}/state`);
 }
 
+export interface TrackMetadata {
+  track_id: string;
+  track_name: string | null;
+  artist_name: string | null;
+  album_name: string | null;
+  album_image_url: string | null;
+  duration_ms: number;
+}
+
+// Metadata for a track_id from a compact state (?compact=true)
+export async function getTrack(trackId: string): Promise<TrackMetadata> {
+  return api(`/playback/tracks/${encodeURIComponent(trackId)}`);
+}
+
+interface StreamEvent {
+  account_id: number;
+  state?: Partial<PlaybackState>;
+  error?: string | null;
+  removed?: boolean;
+}
+
+type StateListener = (state: PlaybackState | null, error: string | null) => void;
+
+// One shared EventSource for every account card; the server only sends changed fields
+const streamStates = new Map<number, PlaybackState>();
+const streamErrors = new Map<number, string | null>();
+const streamListeners = new Map<number, Set<StateListener>>();
+let streamSource: EventSource | null = null;
+
+function handleStreamEvent(event: StreamEvent) {
+  const id = event.account_id;
+  if (event.removed) {
+    streamStates.delete(id);
+    streamErrors.delete(id);
+  } else {
+    if (event.state) {
+      const prev = streamStates.get(id);
+      streamStates.set(id, { ...prev, ...event.state } as PlaybackState);
+    }
+    if (event.error !== undefined) streamErrors.set(id, event.error);
+  }
+  const state = streamStates.get(id) ?? null;
+  const error = streamErrors.get(id) ?? null;
+  streamListeners.get(id)?.forEach((listener) => listener(state, error));
+}
+
+export function subscribePlaybackState(
+  accountId: number,
+  listener: StateListener
+): () => void {
+  if (!streamSource) {
+    streamSource = new EventSource(`${BASE}/playback/stream`);
+    streamSource.onmessage = (e) => handleStreamEvent(JSON.parse(e.data));
+  }
+  const listeners = streamListeners.get(accountId) ?? new Set<StateListener>();
+  streamListeners.set(accountId, listeners);
+  listeners.add(listener);
+  listener(streamStates.get(accountId) ?? null, streamErrors.get(accountId) ?? null);
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) streamListeners.delete(accountId);
+    if (streamListeners.size === 0 && streamSource) {
+      streamSource.close();
+      streamSource = null;
+    }
+  };
+}
+
 export async function play(accountId: number): Promise<void> {
   await api(`/playback/${accountId}/play`, { method: "PUT" });
 }
@@ -96,3 +169,25 @@ export async function nextTrack(accountId: number): Promise<void> {
 export async function previousTrack(accountId: number): Promise<void> {
   await api(`/playback/${accountId}/previous`, { method: "POST" });
 }
+
+export type GroupCommandName = "play" | "pause" | "volume" | "seek" | "next" | "previous";
+
+export interface GroupCommandResult {
+  account_id: number;
+  ok: boolean;
+  error: string | null;
+  coalesced: boolean;
+  latency_ms: number;
+}
+
+export async function groupCommand(
+  command: GroupCommandName,
+  accountIds?: number[],
+  value?: number
+): Promise<GroupCommandResult[]> {
+  return api("/playback/group", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ command, account_ids: accountIds ?? null, value: value ?? null }),
+  });
+}
@@ -61,6 +61,9 @@ export function AccountCard({ account, selected, onToggleSelect, onRemoved }: Pr
       </div>
 
       {error && <div className="error">Error: {error}</div>}
+      {!error && state?.stale && (
+        <div className="stale">Spotify isn't responding — showing the last known state</div>
+      )}
 
       {state ? (
         <>
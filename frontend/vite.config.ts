@@ -9,6 +9,7 @@ export default defineConfig({
       "/playback": "http://localhost:8000",
       "/api": "http://localhost:8000",
       "/google": "http://localhost:8000",
+      "/media": "http://localhost:8000",
     },
   },
 });